@@ -5,11 +5,12 @@
 # end must have the given letter.
 
 from constraint import Problem, AllDifferentConstraint
-from itertools import permutations
+from propagators import EndViewConstraint
+from search import SearchSolver
 
 # Example puzzle from:
 # https://www.janko.at/Raetsel/Abc-End-View/550.a.htm
-# Solves in 1.2s
+# Solves in 0.05s
 
 letters = "ABCDEF"
 
@@ -22,77 +23,74 @@ bottom = "AFCFE.B"
 
 N = len(letters)
 S = len(left)  # size of the grid.
-B = S - N  # number of blanks per row/column.
 
-# Each variable represents the column position of the given letter in the given row.
-variables = [letter + str(row) for letter in letters for row in range(S)]
-problem = Problem()
-problem.addVariables(variables, list(range(S)))
+SIDES = ["left", "right", "top", "bottom"]
 
-# Within a row, each letter must be in a different column.
-for row in range(S):
-	rowvars = [letter + str(row) for letter in letters]
-	problem.addConstraint(AllDifferentConstraint(), rowvars)
+# Each variable represents the column position of the given letter in the given row.
+def rules(letters, S, solver=None):
+	variables = [letter + str(row) for letter in letters for row in range(S)]
+	problem = Problem(solver or SearchSolver())
+	problem.addVariables(variables, list(range(S)))
 
-# The columns that a single given letter appears in must be all different.
-for letter in letters:
-	lettervars = [letter + str(row) for row in range(S)]
-	problem.addConstraint(AllDifferentConstraint(), lettervars)
+	# Within a row, each letter must be in a different column.
+	for row in range(S):
+		rowvars = [letter + str(row) for letter in letters]
+		problem.addConstraint(AllDifferentConstraint(), rowvars)
 
-# Left constraints: if specified, the column of the letter given in the constraint must be
-# less than the column of every other letter in that row.
-for row, letter in enumerate(left):
-	if letter == ".": continue
-	for other in letters:
-		if other != letter:
-			problem.addConstraint(lambda x, y: x < y, (letter + str(row), other + str(row)))
-# Right constraints: if specified, the column of the letter given in the constraint must be
-# greater than the column of every other letter in that row.
-for row, letter in enumerate(right):
-	if letter == ".": continue
-	for other in letters:
-		if other != letter:
-			problem.addConstraint(lambda x, y: x > y, (letter + str(row), other + str(row)))
+	# The columns that a single given letter appears in must be all different.
+	for letter in letters:
+		lettervars = [letter + str(row) for row in range(S)]
+		problem.addConstraint(AllDifferentConstraint(), lettervars)
+	return problem
 
-# Top constraints are implemented by finding the topmost variable that appears in a given column,
-# and checking whether it's the correct letter. We order the letters so that the correct letters
-# are the 0th, Nth, 2Nth, etc. Thus the constraint is equivalent to whether the index of the first
-# variable whose value is the given col is divisible by N.
-# Bottom constraints work the same way.
-def tbconstraint(col):
-	def ok(*values):
-		for j, value in enumerate(values):
-			if value == col:
-				return j % N == 0
-		return False
-	return ok
+# Each clue is an EndViewConstraint over the places every letter could be along the line,
+# nearest the clue first. In a row, a letter is at col if its variable is col. In a column,
+# a letter is at row if that row's variable for the letter is col. Returns a (key, constraint,
+# variables) for each clue, where key is (side, row or column).
+def clues(letters, left, right, top, bottom):
+	S = len(left)
+	lines = {
+		"left": lambda row: { other: [(other + str(row), col) for col in range(S)] for other in letters },
+		"right": lambda row: { other: [(other + str(row), col) for col in reversed(range(S))] for other in letters },
+		"top": lambda col: { other: [(other + str(row), col) for row in range(S)] for other in letters },
+		"bottom": lambda col: { other: [(other + str(row), col) for row in reversed(range(S))] for other in letters },
+	}
+	found = []
+	for side, view in zip(SIDES, (left, right, top, bottom)):
+		for k, letter in enumerate(view):
+			if letter == ".": continue
+			positions = lines[side](k)
+			variables = sorted(set(variable for pairs in positions.values() for variable, value in pairs))
+			found.append(((side, k), EndViewConstraint(letter, positions), variables))
+	return found
 
-# Order the variables in the given set of rows such that the ones with the given letter appear at
-# indices that are divisible by N.
-def orderedvars(rows, letter):
-	values = []
-	for j, row in enumerate(rows):
-		values.append(letter + str(row))
-		# No need to check the incorrect letters on the last row in the list.
-		# (This makes a huge difference in runtime!)
-		if j < len(rows) - 1:
-			values += [other + str(row) for other in letters if other != letter]
-	return values
+def model(letters, left, right, top, bottom):
+	problem = rules(letters, len(left))
+	for key, constraint, variables in clues(letters, left, right, top, bottom):
+		problem.addConstraint(constraint, variables)
+	return problem
 
-# Top constraints. We only have to check the top B+1 rows.
-for col, letter in enumerate(top):
-	if letter == ".": continue
-	problem.addConstraint(tbconstraint(col), orderedvars(range(B+1), letter))
-# Bottom constraints. We only have to check the bottom B+1 rows, starting from the bottom.
-for col, letter in enumerate(bottom):
-	if letter == ".": continue
-	problem.addConstraint(tbconstraint(col), orderedvars(range(S-1, S-B-2, -1), letter))
+# The letters seen from each side (left, right, top, bottom) of a solution.
+def views(letters, solution):
+	S = len(solution) // len(letters)
+	grid = [[None] * S for row in range(S)]
+	for variable, col in solution.items():
+		grid[int(variable[1:])][col] = variable[0]
+	first = lambda line: next(letter for letter in line if letter)
+	return (
+		"".join(first(grid[row]) for row in range(S)),
+		"".join(first(reversed(grid[row])) for row in range(S)),
+		"".join(first(grid[row][col] for row in range(S)) for col in range(S)),
+		"".join(first(grid[row][col] for row in reversed(range(S))) for col in range(S)),
+	)
 
-for solution in problem.getSolutions():
-	grid = [["." for col in range(S)] for row in range(S)]
-	for value, col in solution.items():
-		letter = value[0]
-		row = int(value[1:])
-		grid[row][col] = letter
-	print("\n".join(" ".join(row) for row in grid))
+problem = model(letters, left, right, top, bottom)
 
+if __name__ == "__main__":
+	for solution in problem.getSolutions():
+		grid = [["." for col in range(S)] for row in range(S)]
+		for value, col in solution.items():
+			letter = value[0]
+			row = int(value[1:])
+			grid[row][col] = letter
+		print("\n".join(" ".join(row) for row in grid))
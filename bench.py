@@ -0,0 +1,249 @@
+# Benchmarks for the example puzzles.
+
+# Usage:
+#   python3 bench.py                    run the benchmarks and write the results to bench.json
+#   python3 bench.py sudoku nqueens     only run benchmarks whose names start with these
+#   python3 bench.py --slow             include the benchmarks that take minutes
+#   python3 bench.py --save-baseline    also store the results as the baseline to compare against
+#   python3 bench.py --memory           also record each benchmark's peak memory
+#   python3 bench.py --propagate        reduce the domains with consistency.propagate before solving
+#   python3 bench.py --ordering mrv --values lcv    search with other heuristics (see search.py)
+#   python3 bench.py --sat              solve with cnf.SatSolver instead (more of the benchmarks are
+#                                       slow then, see SATSLOW)
+
+# Each benchmark builds a puzzle's Problem, either by importing the script (which builds its
+# example problem without solving it) or by calling the script's model function for generated
+# instances, then finds every solution with SearchSolver. After the warmup runs, each timed run
+# records the wall time. With --memory, one more run under tracemalloc (which slows it down a lot)
+# records the peak memory. The number of solutions and search nodes (SAT decisions, with --sat)
+# come from the last timed run. With --propagate, the domains are reduced once after building,
+# and that time and the number of values removed are recorded too.
+
+# If a baseline exists, each benchmark's median time is compared with the baseline's, and the
+# program exits with status 1 if any benchmark got slower by more than the threshold or found a
+# different number of solutions. No baseline is shipped, since the times depend on the machine:
+# run with --save-baseline on the machine to compare on first. Until then, a notice says there's
+# nothing to compare with.
+
+import argparse, importlib.util, json, os, platform, random, statistics, sys, time, tracemalloc
+from cnf import SatSolver
+from consistency import propagate
+import deduction
+from search import SearchSolver, ORDERINGS
+from topology import Grid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS = os.path.join(HERE, "bench.json")
+BASELINE = os.path.join(HERE, "bench-baseline.json")
+
+# Import one of the puzzle scripts by file name (they have dashes, so they can't be imported
+# normally). Importing doesn't run the solve, since that's under __main__.
+scripts = {}
+def script(name):
+	if name not in scripts:
+		spec = importlib.util.spec_from_file_location(name.replace("-", "_"), os.path.join(HERE, name + ".py"))
+		module = importlib.util.module_from_spec(spec)
+		sys.modules[spec.name] = module
+		spec.loader.exec_module(module)
+		scripts[name] = module
+	return scripts[name]
+
+# A sudoku with the given number of givens, made by shuffling a solved grid and blanking cells.
+def gensudoku(givens, seed):
+	rnd = random.Random(seed)
+	digits = list("123456789")
+	rnd.shuffle(digits)
+	bands = rnd.sample(range(3), 3)
+	rows = [band * 3 + r for band in bands for r in rnd.sample(range(3), 3)]
+	stacks = rnd.sample(range(3), 3)
+	cols = [stack * 3 + c for stack in stacks for c in rnd.sample(range(3), 3)]
+	solved = [[digits[(3 * (r % 3) + r // 3 + c) % 9] for c in cols] for r in rows]
+	shown = set(rnd.sample(range(81), givens))
+	return "\n".join(
+		"".join(solved[r][c] if r * 9 + c in shown else "." for c in range(9))
+		for r in range(9)
+	)
+
+# A random placement of N stars per row and column, with no two stars adjacent, as a list of
+# each row's layout.
+def genstars(S, N, rnd):
+	layouts = script("star-battle").rowlayouts(S, N)
+	def place(rows, counts):
+		if len(rows) == S:
+			return rows if all(count == N for count in counts) else None
+		for layout in rnd.sample(layouts, len(layouts)):
+			if rows and any(abs(a - b) <= 1 for a in rows[-1] for b in layout):
+				continue
+			newcounts = [count + (x in layout) for x, count in enumerate(counts)]
+			if max(newcounts) > N or any(count + N * (S - len(rows) - 1) < N for count in newcounts):
+				continue
+			found = place(rows + [layout], newcounts)
+			if found:
+				return found
+	return place([], [0] * S)
+
+# A Star Battle map of size S with S groups and N stars per group. Stars are placed first, and
+# each group grows at random from N of them, so the map has at least one solution. (Groups aren't
+# always connected.)
+def genstarbattle(S, N, seed):
+	rnd = random.Random(seed)
+	cells = [(x, y) for y in range(S) for x in range(S)]
+	stars = [(x, y) for y, layout in enumerate(genstars(S, N, rnd)) for x in layout]
+	rnd.shuffle(stars)
+	owner = {}
+	for k, cell in enumerate(stars):
+		owner[cell] = k % S
+	while len(owner) < len(cells):
+		x, y = rnd.choice(list(owner))
+		dx, dy = rnd.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+		if 0 <= x + dx < S and 0 <= y + dy < S and (x + dx, y + dy) not in owner:
+			owner[(x + dx, y + dy)] = owner[(x, y)]
+	return "\n".join("".join(chr(65 + owner[(x, y)]) for x in range(S)) for y in range(S))
+
+# name: (function that returns a fresh or reusable Problem, whether it takes minutes)
+# A Masyu grid's problem, with the edges that can be deduced already set.
+def masyu(text):
+	grid = Grid(text)
+	known = deduction.masyu(grid, grid.edges())
+	if known is None:
+		raise ValueError("the Masyu grid has no solution")
+	return script("masyu").model(grid, known)
+
+BENCHMARKS = {
+	"sudoku": (lambda: script("sudoku").model(script("sudoku").grid), False),
+	"nqueens-8": (lambda: script("nqueens").model(8), False),
+	"nqueens-10": (lambda: script("nqueens").model(10), False),
+	"nqueens-12": (lambda: script("nqueens").model(12), True),
+	"hitori": (lambda: script("hitori").problem, False),
+	"star-battle": (lambda: script("star-battle").model(script("star-battle").grid, 2), False),
+	"star-battle-partial": (lambda: script("star-battle-partial").problem, False),
+	"star-battle-0": (lambda: script("star-battle-0").problem, True),
+	"abc": (lambda: script("abc").problem, False),
+	"masyu": (lambda: script("masyu").problem, False),
+	"masyu-15": (lambda: masyu(script("masyu").grid15), True),
+	"compromised": (lambda: script("compromised").problem, False),
+	"fences": (lambda: script("fences").problem, True),
+}
+# Generated instances, to see how things scale.
+for givens in (36, 30, 26):
+	BENCHMARKS["sudoku-gen-%d" % givens] = (lambda givens=givens: script("sudoku").model(gensudoku(givens, givens)), False)
+for S in (8, 10, 12):
+	N = 1 if S < 10 else 2
+	BENCHMARKS["star-battle-gen-%d" % S] = (lambda S=S, N=N: script("star-battle").model(genstarbattle(S, N, S), N), S > 10)
+# Benchmarks that also take minutes with --sat: models with many values per variable, or many
+# solutions, each of which is another SAT solve (one solve each: nqueens-10 37s, star-battle-gen-10
+# 18s, star-battle 12s, sudoku-gen-26 9s, against under a second searching).
+SATSLOW = ["nqueens-10", "star-battle", "star-battle-gen-10", "sudoku-gen-26"]
+
+def solve(problem, ordering="mrv", values=None, sat=False):
+	solver = SatSolver() if sat else SearchSolver(ordering=ordering, values=values)
+	problem.setSolver(solver)
+	solutions = sum(1 for solution in problem.getSolutionIter())
+	return solutions, solver.stats.get("decisions" if sat else "nodes", 0)
+
+def run(name, warmup, repeat, reduce=False, ordering="mrv", values=None, sat=False, memory=False):
+	build, slow = BENCHMARKS[name]
+	start = time.perf_counter()
+	problem = build()
+	buildtime = time.perf_counter() - start
+	propagatetime = removed = 0
+	if reduce:
+		start = time.perf_counter()
+		report = propagate(problem)
+		propagatetime = time.perf_counter() - start
+		removed = sum(size - after for size, after in report.values())
+	for _ in range(warmup):
+		solve(problem, ordering, values, sat)
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		solutions, nodes = solve(problem, ordering, values, sat)
+		times.append(time.perf_counter() - start)
+	peak = None
+	if memory:
+		tracemalloc.start()
+		solve(problem, ordering, values, sat)
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+	return {
+		"build": buildtime,
+		"propagate": propagatetime,
+		"removed": removed,
+		"times": times,
+		"median": statistics.median(times),
+		"min": min(times),
+		"peak": peak,
+		"solutions": solutions,
+		"nodes": nodes,
+	}
+
+# Names of the benchmarks that are slower than the baseline by more than threshold (as a ratio),
+# or that found a different number of solutions.
+def regressions(results, baseline, threshold):
+	bad = []
+	for name, result in results.items():
+		if name not in baseline:
+			continue
+		old = baseline[name]
+		if result["solutions"] != old["solutions"]:
+			bad.append("%s: %d solutions, baseline had %d" % (name, result["solutions"], old["solutions"]))
+		elif result["median"] > old["median"] * threshold:
+			bad.append("%s: %.3fs, baseline %.3fs" % (name, result["median"], old["median"]))
+	return bad
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("names", nargs="*", help="only run benchmarks starting with these")
+	parser.add_argument("--slow", action="store_true", help="include benchmarks that take minutes")
+	parser.add_argument("--warmup", type=int, default=1)
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown ratio")
+	parser.add_argument("--output", default=RESULTS)
+	parser.add_argument("--baseline", default=BASELINE)
+	parser.add_argument("--save-baseline", action="store_true")
+	parser.add_argument("--propagate", action="store_true", help="reduce domains before solving")
+	parser.add_argument("--memory", action="store_true", help="also record the peak memory")
+	parser.add_argument("--ordering", choices=ORDERINGS, default="mrv", help="variable ordering")
+	parser.add_argument("--values", choices=["lcv"], help="value ordering")
+	parser.add_argument("--sat", action="store_true", help="solve with the SAT solver")
+	args = parser.parse_args()
+
+	names = [
+		name for name, (build, slow) in BENCHMARKS.items()
+		if (args.slow or not (slow or args.sat and name in SATSLOW)) and (not args.names or any(name.startswith(n) for n in args.names))
+	]
+	print("%-22s %9s %9s %9s %10s %10s %10s" % ("", "build", "median", "min", "peak KB", "solutions", "nodes"),
+		"%9s %8s" % ("propagate", "removed") if args.propagate else "")
+	results = {}
+	for name in names:
+		result = results[name] = run(
+			name, args.warmup, args.repeat, args.propagate, args.ordering, args.values, args.sat, args.memory)
+		print("%-22s %8.3fs %8.3fs %8.3fs %10s %10d %10d" % (
+			name, result["build"], result["median"], result["min"],
+			"-" if result["peak"] is None else result["peak"] // 1024, result["solutions"], result["nodes"]),
+			"%8.3fs %8d" % (result["propagate"], result["removed"]) if args.propagate else "")
+
+	report = {
+		"python": platform.python_version(),
+		"machine": platform.machine(),
+		"propagate": args.propagate,
+		"ordering": args.ordering,
+		"values": args.values,
+		"sat": args.sat,
+		"results": results,
+	}
+	with open(args.output, "w") as f:
+		json.dump(report, f, indent=1)
+	if args.save_baseline:
+		with open(args.baseline, "w") as f:
+			json.dump(report, f, indent=1)
+	elif os.path.exists(args.baseline):
+		with open(args.baseline) as f:
+			baseline = json.load(f)["results"]
+		bad = regressions(results, baseline, args.threshold)
+		for line in bad:
+			print("REGRESSION", line)
+		if bad:
+			sys.exit(1)
+	else:
+		print("No baseline at %s to compare with: run with --save-baseline first." % args.baseline)
@@ -0,0 +1,229 @@
+# Solving a puzzle again and again as its clues change, for making and minimizing puzzles.
+
+# Usage: python3 clues.py [sudoku|abc] [--seed n] [--sat]
+# Starts from every clue of the example's solution (each cell of the Sudoku, each end of the ABC
+# End View's rows and columns), removes as many as it can while the solution stays unique, and
+# prints the clues left. Then does the same again, rebuilding the Problem for each check the way
+# the scripts do, and prints how many checks per second each way managed.
+
+# A Puzzle is made once from a Problem with only the rules (the structure), and clues are added
+# and removed between solves:
+#   puzzle = Puzzle(sudoku.rules())
+#   puzzle.restrict(key, variable, values)   # the variable must have one of the values
+#   puzzle.add(key, constraint, variables)   # like Problem.addConstraint
+#   puzzle.remove(key); puzzle.restore(key)  # take a clue out, and put it back
+#   status, solutions = puzzle.unique()      # as in unique.py
+# The structure is preprocessed once (python-constraint's preProcess, which can shrink domains),
+# and each solve only preprocesses the clues, on fresh copies of the domains, before searching
+# with the Problem's solver. With a cnf.SatSolver, the structure is compiled to clauses once, and
+# each clue's clauses get a guard literal of their own, so that a solve only assumes the guards of
+# the clues that are in. Everything the SAT solver learns (clauses, activities and phases) is kept
+# from one solve to the next, and a clue that's removed and put back uses the same clauses again.
+# The first solution found is kept too, for as long as the clues allow it: taking a clue out
+# always does. Then it isn't searched for again, and a uniqueness check only has to search for a
+# different solution (with an ExcludeConstraint, or a clause against it).
+
+import argparse, random, time
+from itertools import islice
+from constraint import Domain
+from cnf import Encoding, SatSolver
+from propagators import ExcludeConstraint
+from unique import status, UNIQUE
+
+class Puzzle(object):
+	def __init__(self, problem):
+		self.solver = problem._solver
+		domains, constraints, vconstraints = problem._getArgs()
+		self.impossible = domains is None
+		self.domains = { variable: list(domain) for variable, domain in (domains or {}).items() }
+		self.constraints = constraints
+		self.vconstraints = vconstraints
+		self.clues = {}  # key: (constraint, variables) or (None, variable, values) for a restriction
+		self.removed = {}  # key: the same, for the clues taken out
+		self.encoding = None
+		self.guards = {}  # key: the literal that switches the clue's clauses on
+		self.known = None  # a solution the clues allow, if one has been found
+		self.checks = 0
+		if isinstance(self.solver, SatSolver) and not self.impossible:
+			self.encoding = Encoding(domains, constraints)
+			self.solver.stats.update(variables=self.encoding.sat.nvars, clauses=len(self.encoding.sat.clauses), rejected=0)
+
+	def add(self, key, constraint, variables):
+		self._put(key, (constraint, list(variables)))
+
+	def restrict(self, key, variable, values):
+		self._put(key, (None, variable, list(values)))
+
+	def remove(self, key):
+		self.removed[key] = self.clues.pop(key)
+
+	def restore(self, key):
+		self.clues[key] = self.removed.pop(key)
+		if self.known is not None and not self._allows(self.clues[key], self.known):
+			self.known = None
+
+	def _allows(self, clue, solution):
+		if clue[0] is None:
+			return solution[clue[1]] in clue[2]
+		constraint, variables = clue
+		return constraint(variables, self.domains, solution)
+
+	def _put(self, key, clue):
+		if key in self.clues or key in self.removed:
+			self.removed.pop(key, None)
+			self.clues.pop(key, None)
+			guard = self.guards.pop(key, None)
+			if guard:
+				self.encoding.sat.addclause([-guard])
+		self.clues[key] = clue
+		if self.known is not None and not self._allows(clue, self.known):
+			self.known = None
+		if self.encoding:
+			encoding = self.encoding
+			guard = self.guards[key] = encoding.sat.newvar()
+			encoding.guards = [guard]
+			if clue[0] is None:
+				literals = encoding.literals[clue[1]]
+				encoding.clause([literals[value] for value in clue[2] if value in literals])
+			else:
+				encoding.encode(*clue)
+			encoding.guards = []
+
+	# The domains, constraints and vconstraints with the clues in (and the known solution
+	# excluded), as Problem._getArgs makes them, or None if some domain is empty.
+	def _args(self):
+		if self.impossible:
+			return None
+		domains = self.domains
+		restricted = {}
+		added = []
+		for clue in self.clues.values():
+			if clue[0] is None:
+				variable, values = clue[1:]
+				restricted[variable] = [value for value in restricted.get(variable, domains[variable]) if value in values]
+			else:
+				added.append(clue)
+		domains = { variable: Domain(restricted.get(variable, values)) for variable, values in domains.items() }
+		if self.known is not None:
+			added.append((ExcludeConstraint(self.known), list(domains)))
+		constraints = self.constraints + added
+		vconstraints = { variable: list(entries) for variable, entries in self.vconstraints.items() }
+		for constraint, variables in added:
+			for variable in variables:
+				vconstraints[variable].append((constraint, variables))
+		for constraint, variables in added:
+			constraint.preProcess(variables, domains, constraints, vconstraints)
+		for domain in domains.values():
+			domain.resetState()
+			if not domain:
+				return None
+		return domains, constraints, vconstraints
+
+	# Up to limit solutions (or all if limit is None) with the clues that are in, and the status.
+	def solve(self, limit=2):
+		self.checks += 1
+		known = [] if self.known is None else [self.known]
+		more = None if limit is None else limit - len(known)
+		found = []
+		if more != 0 and self.encoding:
+			stats = self.solver.stats
+			solutions = self.encoding.solutions(stats, [self.guards[key] for key in self.clues], known)
+			try:
+				found = list(islice(solutions, more))
+			finally:
+				solutions.close()
+			stats.update(self.encoding.sat.stats)
+		elif more != 0:
+			args = self._args()
+			found = list(islice(self.solver.getSolutionIter(*args), more)) if args else []
+		found = known + found
+		if found:
+			self.known = found[0]
+		return status(found, limit), found
+
+	def unique(self):
+		return self.solve(2)
+
+# Takes the clues (keys) out one at a time, in the order given, and puts each back if the puzzle
+# isn't unique without it. Returns the keys kept. Raises ValueError if the puzzle isn't unique to
+# start with.
+def minimize(puzzle, keys):
+	if puzzle.unique()[0] != UNIQUE:
+		raise ValueError("the puzzle doesn't have a unique solution")
+	kept = []
+	for key in keys:
+		puzzle.remove(key)
+		if puzzle.unique()[0] != UNIQUE:
+			puzzle.restore(key)
+			kept.append(key)
+	return kept
+
+# The same, building the whole Problem again for each check with model(keys), as a baseline.
+# Returns the keys kept and the number of checks.
+def rebuild(model, keys):
+	from unique import unique
+	current = list(keys)
+	kept = []
+	checks = 1
+	if unique(model(current))[0] != UNIQUE:
+		raise ValueError("the puzzle doesn't have a unique solution")
+	for key in keys:
+		current.remove(key)
+		checks += 1
+		if unique(model(current))[0] != UNIQUE:
+			current.append(key)
+			kept.append(key)
+	return kept, checks
+
+if __name__ == "__main__":
+	from bench import script
+	sudoku = script("sudoku")
+	abc = script("abc")  # not import abc, which is the standard library's
+	parser = argparse.ArgumentParser()
+	parser.add_argument("puzzle", nargs="?", choices=["sudoku", "abc"], default="sudoku")
+	parser.add_argument("--seed", type=int, default=1, help="for the order the clues are tried in")
+	parser.add_argument("--sat", action="store_true", help="solve with the SAT solver")
+	args = parser.parse_args()
+	rnd = random.Random(args.seed)
+	solver = lambda: SatSolver() if args.sat else None
+
+	if args.puzzle == "sudoku":
+		solution = sudoku.model(sudoku.grid).getSolution()
+		puzzle = Puzzle(sudoku.rules(solver()))
+		for cell in sudoku.cellnames:
+			puzzle.restrict(cell, cell, [solution[cell]])
+		def model(cells):
+			givens = { cell: solution[cell] for cell in cells }
+			return sudoku.model(sudoku.text(givens), solver())
+		def show(cells):
+			return sudoku.text({ cell: solution[cell] for cell in cells })
+	else:
+		problem = abc.model(abc.letters, abc.left, abc.right, abc.top, abc.bottom)
+		views = abc.views(abc.letters, problem.getSolution())
+		puzzle = Puzzle(abc.rules(abc.letters, abc.S, solver()))
+		for key, constraint, variables in abc.clues(abc.letters, *views):
+			puzzle.add(key, constraint, variables)
+		def blank(cells):
+			return ["".join(view[k] if (side, k) in cells else "." for k in range(abc.S)) for side, view in zip(abc.SIDES, views)]
+		def model(cells):
+			problem = abc.model(abc.letters, *blank(cells))
+			if args.sat:
+				problem.setSolver(SatSolver())
+			return problem
+		def show(cells):
+			return "\n".join("%-6s %s" % (side, view) for side, view in zip(abc.SIDES, blank(cells)))
+	keys = list(puzzle.clues)
+	rnd.shuffle(keys)
+
+	start = time.perf_counter()
+	kept = minimize(puzzle, keys)
+	seconds = time.perf_counter() - start
+	print(show(kept))
+	print("%d of %d clues kept" % (len(kept), len(keys)))
+	print("incremental: %4d checks in %7.3fs, %7.1f checks/s" % (puzzle.checks, seconds, puzzle.checks / seconds))
+	start = time.perf_counter()
+	again, checks = rebuild(model, keys)
+	seconds = time.perf_counter() - start
+	print("rebuild:     %4d checks in %7.3fs, %7.1f checks/s" % (checks, seconds, checks / seconds))
+	if sorted(again) != sorted(kept):
+		print("rebuilding kept different clues:", sorted(again))
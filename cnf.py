@@ -0,0 +1,438 @@
+# Solving Problems with the SAT solver in sat.py.
+
+# SatSolver can be used in place of the other solvers, with Problem(SatSolver()) or
+# problem.setSolver(SatSolver()). It compiles the problem to CNF and solves that with sat.CDCL,
+# which learns from each conflict. That pays off on the puzzles whose variables are mostly
+# true/false: finding every solution takes about half the time for hitori.py and star-battle-0.py,
+# and a fifth for masyu.py. Models with many values per variable (star-battle.py's row layouts, or
+# sudoku.py) make a lot of clauses and are slower than SearchSolver, as is finding many solutions,
+# since each one found is a separate SAT solve, and the last one has to prove that every other
+# assignment is blocked. bench.py --sat counts those benchmarks as slow.
+
+# Each variable with two values is one SAT variable, true for the second value. A variable with
+# more values has a SAT variable for each value, exactly one of which is true (one-hot). The
+# constraints become clauses like this:
+# * AllDifferentConstraint: at most one of the variables has each value.
+# * AllEqualConstraint: each value of one variable implies the same value of the next.
+# * Sums (ExactSumConstraint, MinSumConstraint, MaxSumConstraint, and CountConstraint) of integer
+#   values: each value's SAT variable is counted as many times as the value is more than the
+#   variable's least value, and the count is bounded with a sequential counter (a SAT variable for
+#   "at least j of the first i are true", for each j up to the bound).
+# * SomeInSetConstraint and SomeNotInSetConstraint: the same counter, over whether each variable's
+#   value is in the set.
+# * ElementConstraint and EndViewConstraint: directly, as clauses of two or three literals.
+# * A constraint whose variables have at most LIMIT combinations of values is checked on all of
+#   them. For two variables, each value gets a clause saying the other variable has one of the
+#   values that go with it. For more, each combination it rejects gets a clause against it.
+# * Anything else, including ConnectedConstraint and LoopConstraint, is checked on each solution
+#   of the clauses. If it's rejected, clauses are added that rule it out, and the SAT solver goes
+#   on from there. For LoopConstraint these forbid each loop that can't be the whole solution
+#   (and clauses that each node has none or two edges on are added up front, so there's always a
+#   loop to forbid), and for ConnectedConstraint each region being cut off while some cell
+#   outside it is open. For the rest, they forbid the constraint's variables having those values
+#   together, which can take very many rounds if the constraint covers many variables.
+# Each solution found is then forbidden too, to find the next.
+
+# With dimacs set to a file name, the clauses (without the ones added while solving) are written
+# there as DIMACS CNF, with comments saying which SAT variable is which value, for other solvers.
+# After solving, stats has the CDCL's counts (decisions, conflicts, learnt, restarts), plus the
+# number of SAT variables and clauses, and how many times a solution of the clauses was rejected
+# ("rejected").
+
+from itertools import product
+from constraint import (Solver, AllDifferentConstraint, AllEqualConstraint, ExactSumConstraint,
+	MaxSumConstraint, MinSumConstraint, InSetConstraint, NotInSetConstraint, SomeInSetConstraint,
+	SomeNotInSetConstraint)
+from propagators import ConnectedConstraint, LoopConstraint, CountConstraint, ElementConstraint, EndViewConstraint
+from sat import CDCL
+
+LIMIT = 4096  # Most combinations to check one by one.
+
+class Encoding(object):
+	def __init__(self, domains, constraints):
+		self.sat = CDCL()
+		self.domains = domains
+		self.literals = {}  # variable: { value: literal }
+		self.lazy = []  # (constraint, variables, guards) checked on each solution
+		self.guards = []  # literals that switch on the clauses being added (see clues.py)
+		for variable, domain in domains.items():
+			values = list(domain)
+			if len(values) == 2:
+				x = self.sat.newvar()
+				self.literals[variable] = { values[0]: -x, values[1]: x }
+			else:
+				literals = [self.sat.newvar() for value in values]
+				self.literals[variable] = dict(zip(values, literals))
+				self.sat.addclause(literals)
+				self.count(literals, high=1)
+		for constraint, variables in constraints:
+			self.encode(constraint, variables)
+
+	def literal(self, variable, value):
+		return self.literals[variable].get(value)
+
+	# With guards, the clause only holds when they're all true.
+	def clause(self, literals):
+		self.sat.addclause(literals + [-g for g in self.guards] if self.guards else literals)
+
+	# From low to high of the literals are true (either may be None). A literal may be given more
+	# than once, to count it more than once.
+	def count(self, literals, low=None, high=None):
+		n = len(literals)
+		if high is not None and high >= n:
+			high = None
+		if low is not None and low <= 0:
+			low = None
+		if (low is not None and low > (n if high is None else high)) or (high is not None and high < 0):
+			self.clause([])
+		elif low is None and high is None:
+			return
+		elif low is None and high == 0:
+			for x in literals:
+				self.clause([-x])
+		elif low == n:
+			for x in literals:
+				self.clause([x])
+		elif low is None and high == 1 and n <= 6:
+			for i in range(n):
+				for j in range(i + 1, n):
+					self.clause([-literals[i], -literals[j]])
+		elif high is None and low == 1:
+			self.clause(literals)
+		else:
+			self.counter(literals, low, high)
+
+	# A sequential counter: s[i][j] is true if at least j + 1 of literals[:i + 1] are (only as far
+	# as j = high is needed). It's made true when enough are, and for a lower bound, only then.
+	def counter(self, literals, low, high):
+		n = len(literals)
+		size = max(low or 0, high + 1 if high is not None else 0)
+		newvar = self.sat.newvar
+		s = []
+		for i, x in enumerate(literals):
+			row = [newvar() for j in range(min(i + 1, size))]
+			last = s[-1] if s else []
+			for j, y in enumerate(row):
+				before = last[j] if j < len(last) else None
+				carry = last[j - 1] if j else None
+				if before:
+					self.clause([-before, y])
+				if j == 0:
+					self.clause([-x, y])
+				else:
+					self.clause([-x, -carry, y])
+				if low is not None:
+					either = [before] if before else []
+					self.clause([-y, x] + either)
+					if j:
+						self.clause([-y, carry] + either)
+			s.append(row)
+		if high is not None:
+			self.clause([-s[-1][high]])
+		if low is not None:
+			self.clause([s[-1][low - 1]])
+
+	# weights has a { value: weight } for each variable, and the sum of the weights of their
+	# values must be from low to high (either may be None). Returns False if the weights aren't
+	# all integers.
+	def weighted(self, variables, weights, low, high):
+		if not all(isinstance(w, int) for weight in weights for w in weight.values()):
+			return False
+		counted = []
+		for variable, weight in zip(variables, weights):
+			least = min(weight.values())
+			low = None if low is None else low - least
+			high = None if high is None else high - least
+			for value, w in weight.items():
+				counted += [self.literal(variable, value)] * (w - least)
+		self.count(counted, low, high)
+		return True
+
+	# Whether the variable's value is in values, as a literal (with a new SAT variable if it
+	# takes more than one), or True or False if it always or never is.
+	def member(self, variable, values):
+		literals = [x for value, x in self.literals[variable].items() if value in values]
+		if len(literals) == len(self.literals[variable]):
+			return True
+		if not literals:
+			return False
+		if len(literals) == 1:
+			return literals[0]
+		x = self.sat.newvar()
+		self.clause([-x] + literals)
+		for other in literals:
+			self.clause([-other, x])
+		return x
+
+	def encode(self, constraint, variables):
+		domains = self.domains
+		if isinstance(constraint, (InSetConstraint, NotInSetConstraint)):
+			keep = isinstance(constraint, InSetConstraint)
+			for variable in variables:
+				for value, x in self.literals[variable].items():
+					if (value in constraint._set) != keep:
+						self.clause([-x])
+		elif isinstance(constraint, AllDifferentConstraint):
+			values = set(value for variable in variables for value in domains[variable])
+			for value in values:
+				literals = [self.literal(variable, value) for variable in variables if value in domains[variable]]
+				self.count(literals, high=1)
+		elif isinstance(constraint, AllEqualConstraint):
+			for a, b in zip(variables, variables[1:]):
+				for x, y in ((a, b), (b, a)):
+					for value, literal in self.literals[x].items():
+						other = self.literal(y, value)
+						self.clause([-literal] + ([other] if other else []))
+		elif isinstance(constraint, (ExactSumConstraint, MaxSumConstraint, MinSumConstraint, CountConstraint)):
+			if not self.sum(constraint, variables):
+				self.general(constraint, variables)
+		elif isinstance(constraint, (SomeInSetConstraint, SomeNotInSetConstraint)):
+			n = constraint._n
+			literals = []
+			for variable in variables:
+				if isinstance(constraint, SomeInSetConstraint):
+					x = self.member(variable, constraint._set)
+				else:
+					x = self.member(variable, [value for value in domains[variable] if value not in constraint._set])
+				if x is True:
+					n -= 1
+				elif x is not False:
+					literals.append(x)
+			self.count(literals, n, n if constraint._exact else None)
+		elif isinstance(constraint, ElementConstraint):
+			index, result = variables[:2]
+			array = variables[2:]
+			for i, x in self.literals[index].items():
+				for value, y in self.literals[array[i]].items():
+					z = self.literal(result, value)
+					self.clause([-x, -y] + ([z] if z else []))
+				for value, z in self.literals[result].items():
+					y = self.literal(array[i], value)
+					self.clause([-x, -z] + ([y] if y else []))
+		elif isinstance(constraint, EndViewConstraint):
+			# No other letter at or before the clue's letter.
+			clue = constraint._clue
+			places = [self.literal(*pair) for pair in constraint._positions[clue]]
+			for letter, pairs in constraint._positions.items():
+				if letter == clue:
+					continue
+				for j, pair in enumerate(pairs):
+					other = self.literal(*pair)
+					for x in places[j:]:
+						if other and x:
+							self.clause([-other, -x])
+		else:
+			self.general(constraint, variables)
+
+	def sum(self, constraint, variables):
+		if isinstance(constraint, CountConstraint):
+			counts = constraint._counts or [None] * len(variables)
+			weights = [
+				{ value: value if count is None else count[value] for value in self.literals[variable] }
+				for variable, count in zip(variables, counts)
+			]
+			return self.weighted(variables, weights, constraint._total, constraint._total)
+		multipliers = constraint._multipliers or [1] * len(variables)
+		weights = [
+			{ value: value * m for value in self.literals[variable] }
+			for variable, m in zip(variables, multipliers)
+		]
+		if isinstance(constraint, ExactSumConstraint):
+			low = high = constraint._exactsum
+		elif isinstance(constraint, MaxSumConstraint):
+			low, high = None, constraint._maxsum
+		else:
+			low, high = constraint._minsum, None
+		return self.weighted(variables, weights, low, high)
+
+	# Each node of a loop has none or two of its edges on, so whatever the clauses allow is a set
+	# of loops, and a cut can always rule out one of them.
+	def degrees(self, constraint, variables):
+		incident = {}
+		for edge in variables:
+			for node in constraint._ends[edge]:
+				x = self.literal(edge, True)
+				if x:
+					incident.setdefault(node, []).append(x)
+		for node, literals in incident.items():
+			self.count(literals, high=2)
+			for x in literals:
+				self.clause([-x] + [y for y in literals if y != x])
+			if node in constraint._required:
+				self.clause(literals)
+
+	# A clause against each combination the constraint rejects, or check it on each solution.
+	def general(self, constraint, variables):
+		combinations = 1
+		for variable in variables:
+			combinations *= len(self.domains[variable])
+		if isinstance(constraint, LoopConstraint):
+			self.degrees(constraint, variables)
+		if isinstance(constraint, (ConnectedConstraint, LoopConstraint)) or combinations > LIMIT:
+			self.lazy.append((constraint, variables, tuple(self.guards)))
+			return
+		combinations = product(*[list(self.literals[variable]) for variable in variables])
+		allowed = [values for values in combinations if constraint(variables, self.domains, dict(zip(variables, values)))]
+		if len(variables) == 2 and len(set(variables)) == 2:
+			# Each value implies one of the other variable's values that go with it.
+			for k in (0, 1):
+				x, y = variables[k], variables[1 - k]
+				for value, literal in self.literals[x].items():
+					self.clause([-literal] + sorted(set(self.literal(y, values[1 - k]) for values in allowed if values[k] == value)))
+			return
+		allowed = set(allowed)
+		for values in product(*[list(self.literals[variable]) for variable in variables]):
+			if values not in allowed:
+				self.clause([-self.literal(variable, value) for variable, value in zip(variables, values)])
+
+	def solution(self):
+		sat = self.sat
+		return {
+			variable: next(value for value, x in literals.items() if sat[x])
+			for variable, literals in self.literals.items()
+		}
+
+	# Clauses that rule out the solution for a constraint that rejects it.
+	def cuts(self, constraint, variables, solution):
+		if isinstance(constraint, LoopConstraint):
+			cuts = self.loopcuts(constraint, variables, solution)
+		elif isinstance(constraint, ConnectedConstraint):
+			cuts = self.connectedcuts(constraint, variables, solution)
+		else:
+			cuts = []
+		return cuts or [[-self.literal(variable, solution[variable]) for variable in variables]]
+
+	# A loop without some required node can't be the solution. One with all of them can't be
+	# part of it along with any other edge.
+	def loopcuts(self, constraint, variables, solution):
+		ends = constraint._ends
+		ons = [edge for edge in variables if solution[edge]]
+		parent = {}
+		def find(node):
+			while parent.get(node, node) != node:
+				node = parent[node]
+			return node
+		degree = {}
+		for edge in ons:
+			a, b = ends[edge]
+			degree[a] = degree.get(a, 0) + 1
+			degree[b] = degree.get(b, 0) + 1
+			ra, rb = find(a), find(b)
+			if ra != rb:
+				parent[ra] = rb
+		pieces = {}
+		for edge in ons:
+			pieces.setdefault(find(ends[edge][0]), []).append(edge)
+		cuts = []
+		for root, edges in pieces.items():
+			nodes = set(node for edge in edges for node in ends[edge])
+			if len(edges) != len(nodes) or any(degree[node] != 2 for node in nodes):
+				continue
+			clause = [-self.literal(edge, solution[edge]) for edge in edges]
+			if not constraint._required <= nodes:
+				cuts.append(clause)
+			else:
+				other = next((edge for edge in ons if edge not in edges), None)
+				if other is not None:
+					cuts.append(clause + [-self.literal(other, solution[other])])
+		return cuts
+
+	# For each open region, some cell of it is blocked, or some cell next to it is open, or a
+	# cell of another region is blocked.
+	def connectedcuts(self, constraint, variables, solution):
+		blocked = constraint._blocked
+		neighbors = constraint._neighbors
+		inside = set(variables)
+		isopen = lambda v: v in inside and solution[v] not in blocked
+		regions = []
+		seen = set()
+		for root in variables:
+			if root in seen or not isopen(root):
+				continue
+			region = [root]
+			seen.add(root)
+			for v in region:
+				for other in neighbors[v]:
+					if other not in seen and isopen(other):
+						seen.add(other)
+						region.append(other)
+			regions.append(region)
+		if len(regions) < 2:
+			return []
+		values = lambda v, block: [x for value, x in self.literals[v].items() if (value in blocked) == block]
+		cuts = []
+		for k, region in enumerate(regions):
+			border = set(other for v in region for other in neighbors[v] if other in inside) - set(region)
+			clause = [x for v in region for x in values(v, True)]
+			clause += [x for v in border for x in values(v, False)]
+			clause += values(regions[k - 1][0], True)
+			cuts.append(clause)
+		return cuts
+
+	# Each solution that all the constraints accept. With assumptions (a list of literals, maybe
+	# empty), only the clauses and lazy constraints whose guards are among them count, and each
+	# solution (and each of blocked, to begin with) is blocked under a guard of its own that's
+	# switched off for good at the end, so later calls start over. Close the generator if it's left
+	# before the end.
+	def solutions(self, stats, assumptions=None, blocked=()):
+		sat = self.sat
+		query = None
+		if assumptions is not None:
+			query = sat.newvar()
+			active = set(assumptions)
+			assumptions = list(assumptions) + [query]
+			for solution in blocked:
+				sat.addclause([-self.literal(variable, value) for variable, value in solution.items()] + [-query])
+		lazy = [entry for entry in self.lazy if query is None or active.issuperset(entry[2])]
+		try:
+			while sat.solve(assumptions or ()):
+				solution = self.solution()
+				rejected = [
+					(constraint, variables, guards) for constraint, variables, guards in lazy
+					if not constraint(variables, self.domains, solution)
+				]
+				if rejected:
+					stats["rejected"] += 1
+					for constraint, variables, guards in rejected:
+						for clause in self.cuts(constraint, variables, solution):
+							sat.addclause(clause + [-g for g in guards])
+					continue
+				yield solution
+				block = [-self.literal(variable, value) for variable, value in solution.items()]
+				sat.addclause(block + [-query] if query else block)
+		finally:
+			if query:
+				sat.addclause([-query])
+
+	def write(self, filename):
+		comments = [
+			"%d %r=%r" % (x, variable, value)
+			for variable, literals in self.literals.items() for value, x in literals.items() if x > 0
+		]
+		with open(filename, "w") as f:
+			self.sat.write(f, comments)
+
+class SatSolver(Solver):
+	def __init__(self, dimacs=None):
+		self.dimacs = dimacs
+		self.stats = {}
+
+	def getSolutionIter(self, domains, constraints, vconstraints):
+		encoding = Encoding(domains, constraints)
+		if self.dimacs:
+			encoding.write(self.dimacs)
+		stats = self.stats
+		stats.clear()
+		stats["variables"] = encoding.sat.nvars
+		stats["clauses"] = len(encoding.sat.clauses)
+		stats["rejected"] = 0
+		for solution in encoding.solutions(stats):
+			stats.update(encoding.sat.stats)
+			yield solution
+		stats.update(encoding.sat.stats)
+
+	def getSolution(self, domains, constraints, vconstraints):
+		return next(self.getSolutionIter(domains, constraints, vconstraints), None)
+
+	def getSolutions(self, domains, constraints, vconstraints):
+		return list(self.getSolutionIter(domains, constraints, vconstraints))
@@ -0,0 +1,133 @@
+# Domain reduction before searching.
+
+# propagate(problem) removes values from a Problem's domains that can't be part of any solution,
+# by looking at one constraint at a time, and repeats until nothing changes (AC-3). The domains
+# are shrunk in place, so the search that follows starts from them. It returns each variable's
+# domain size before and after, and stops early if a domain becomes empty, since then there's no
+# solution.
+
+# How each constraint is checked, depending on what it is:
+# * InSetConstraint and NotInSetConstraint keep the values in or out of their set. (They can't be
+#   called, since the solver handles them before searching.)
+# * Sum constraints (ExactSumConstraint, MinSumConstraint, MaxSumConstraint) keep a value only if
+#   the smallest and largest sums the other variables could make allow it (bounds consistency).
+# * A constraint whose variables have at most LIMIT combinations of values, which includes every
+#   unary and most binary constraints, is checked on every combination, and keeps the values that
+#   appear in some combination it accepts (arc consistency).
+# * Any other constraint is asked about each value on its own, along with the values of variables
+#   that only have one value left. It keeps the values it doesn't reject, which is as much as its
+#   check on partial assignments can tell. (For AllDifferentConstraint, this removes the values
+#   that other variables are known to have.)
+
+from collections import deque
+from itertools import product
+from constraint import ExactSumConstraint, MaxSumConstraint, MinSumConstraint, InSetConstraint, NotInSetConstraint
+
+LIMIT = 10000  # Largest number of combinations checked one by one.
+
+# The values of each variable that are allowed by a sum constraint.
+def _sum(constraint, variables, domains):
+	multipliers = constraint._multipliers or [1] * len(variables)
+	low = [min(value * m for value in domains[variable]) for variable, m in zip(variables, multipliers)]
+	high = [max(value * m for value in domains[variable]) for variable, m in zip(variables, multipliers)]
+	lowsum = sum(low)
+	highsum = sum(high)
+	if isinstance(constraint, ExactSumConstraint):
+		minsum = maxsum = constraint._exactsum
+	elif isinstance(constraint, MaxSumConstraint):
+		minsum, maxsum = None, constraint._maxsum
+	else:
+		minsum, maxsum = constraint._minsum, None
+	allowed = {}
+	for k, (variable, m) in enumerate(zip(variables, multipliers)):
+		allowed[variable] = [
+			value for value in domains[variable]
+			if (maxsum is None or lowsum - low[k] + value * m <= maxsum)
+			and (minsum is None or highsum - high[k] + value * m >= minsum)
+		]
+	return allowed
+
+# The values of each variable that appear in a combination the constraint accepts.
+def _combinations(constraint, variables, domains):
+	allowed = { variable: set() for variable in variables }
+	for values in product(*[domains[variable] for variable in variables]):
+		assignments = dict(zip(variables, values))
+		if constraint(variables, domains, assignments):
+			for variable, value in assignments.items():
+				allowed[variable].add(value)
+	return allowed
+
+# The values of each variable that the constraint doesn't reject on their own.
+def _probe(constraint, variables, domains):
+	known = { variable: domains[variable][0] for variable in variables if len(domains[variable]) == 1 }
+	allowed = {}
+	for variable in variables:
+		allowed[variable] = []
+		for value in domains[variable]:
+			assignments = dict(known)
+			assignments[variable] = value
+			if constraint(variables, domains, assignments):
+				allowed[variable].append(value)
+	return allowed
+
+# The values allowed, and whether checking the constraint again after removing the rest would
+# allow them all. That's so for the set and combination checks, but not for the sum and probe
+# checks, since the bounds and the known values they use change when values are removed.
+def _revise(constraint, variables, domains):
+	if isinstance(constraint, (InSetConstraint, NotInSetConstraint)):
+		keep = isinstance(constraint, InSetConstraint)
+		return {
+			variable: [value for value in domains[variable] if (value in constraint._set) == keep]
+			for variable in variables
+		}, True
+	if isinstance(constraint, (ExactSumConstraint, MaxSumConstraint, MinSumConstraint)):
+		return _sum(constraint, variables, domains), False
+	combinations = 1
+	for variable in variables:
+		combinations *= len(domains[variable])
+		if combinations > LIMIT:
+			return _probe(constraint, variables, domains), False
+	return _combinations(constraint, variables, domains), True
+
+# Returns { variable: (size before, size after) }.
+def propagate(problem):
+	domains = problem._variables
+	constraints = [(constraint, variables or list(domains)) for constraint, variables in problem._constraints]
+	vconstraints = { variable: [] for variable in domains }
+	for k, (constraint, variables) in enumerate(constraints):
+		for variable in variables:
+			vconstraints[variable].append(k)
+	sizes = { variable: len(domain) for variable, domain in domains.items() }
+
+	queue = deque(range(len(constraints)) if all(domains.values()) else [])
+	queued = set(queue)
+	while queue:
+		k = queue.popleft()
+		queued.discard(k)
+		constraint, variables = constraints[k]
+		allowed, final = _revise(constraint, variables, domains)
+		for variable in variables:
+			domain = domains[variable]
+			if len(allowed[variable]) == len(domain):
+				continue
+			for value in domain[:]:
+				if value not in allowed[variable]:
+					domain.remove(value)
+			if not domain:
+				queue.clear()
+				break
+			for other in vconstraints[variable]:
+				if (other != k or not final) and other not in queued:
+					queue.append(other)
+					queued.add(other)
+	return { variable: (size, len(domains[variable])) for variable, size in sizes.items() }
+
+# A one-line summary of what propagate did.
+def summary(report):
+	before = sum(size for size, after in report.values())
+	after = sum(after for size, after in report.values())
+	reduced = sum(1 for size, after in report.values() if after < size)
+	line = "%d of %d values removed, from %d of %d variables" % (before - after, before, reduced, len(report))
+	if any(after == 0 for size, after in report.values()):
+		line += " (no solution)"
+	return line
@@ -0,0 +1,306 @@
+# Logical deductions made before searching.
+
+# These fill in the cells that follow from simple rules, the way a person starts a puzzle, so the
+# search starts from smaller domains. Each returns the known cells as a dict of cell to value, or
+# None if the rules show the puzzle has no solution.
+
+from itertools import combinations
+from topology import KING
+
+# Star Battle: each row, column and group has exactly N stars, and no two stars touch.
+# Values are 1 for a star and 0 for an empty cell. Repeats these until nothing changes:
+# * The cells around a star are empty.
+# * A unit (row, column or group) with N stars has its other cells empty. One with exactly as many
+#   cells left as stars needed has them all filled.
+# * Pigeonhole: if the cells left in k groups all lie in k rows, those rows' stars are all in the
+#   groups, so the rest of the rows are empty. Likewise for groups and columns, and the other way
+#   around (k rows or columns whose cells left lie in k groups). Only k up to half the units is
+#   needed, since the complements give the same deductions.
+# * A cell is empty if a star there, followed by the first two rules, leaves some unit without
+#   room for its stars. A row or column has room for as many stars as fit in its cells left
+#   without touching. A group has room for at most one star in each 2x2 block it covers.
+def starbattle(grid, N, known=None):
+	known = dict(known or {})
+	neighbors = grid.neighbors(KING)
+	rows = grid.rows()
+	columns = grid.columns()
+	groups = [cells for name, cells in sorted(grid.regions().items())]
+	lines = rows + columns
+	units = lines + groups
+
+	# Sets a cell's value. Returns False if it already has the other value.
+	def fix(known, cell, value):
+		if cell in known:
+			return known[cell] == value
+		known[cell] = value
+		return True
+
+	# The most stars that could fit in a unit's cells left.
+	def room(known, unit, line):
+		left = [cell for cell in unit if known.get(cell) != 0]
+		if line:
+			# Taken greedily from one end.
+			count = 0
+			last = None
+			for x, y in left:
+				if last is None or abs(x - last[0]) + abs(y - last[1]) > 1:
+					count += 1
+					last = (x, y)
+			return count
+		return min(
+			len(set(((x + dx) // 2, (y + dy) // 2) for x, y in left))
+			for dx in (0, 1) for dy in (0, 1)
+		)
+
+	# Applies the first two rules until nothing changes, and checks every unit has room. Returns
+	# False if something contradicts.
+	def basic(known):
+		while True:
+			before = len(known)
+			for cell, value in list(known.items()):
+				if value == 1 and not all(fix(known, other, 0) for other in neighbors[cell]):
+					return False
+			for k, unit in enumerate(units):
+				count = sum(1 for cell in unit if known.get(cell) == 1)
+				left = [cell for cell in unit if cell not in known]
+				if count > N or count + room(known, unit, k < len(lines)) < N:
+					return False
+				if count == N or count + len(left) == N:
+					for cell in left:
+						fix(known, cell, 1 if count < N else 0)
+			if len(known) == before:
+				return True
+
+	def pigeonhole(known, family, others):
+		# For each unit in family, a bitmask of the units in others that its cells left are in.
+		where = {}
+		for k, unit in enumerate(others):
+			for cell in unit:
+				where[cell] = k
+		masks = [
+			sum(set(1 << where[cell] for cell in unit if known.get(cell) != 0))
+			for unit in family
+		]
+		for k in range(1, len(family) // 2 + 1):
+			for chosen in combinations(range(len(family)), k):
+				mask = 0
+				for i in chosen:
+					mask |= masks[i]
+				if bin(mask).count("1") != k:
+					continue
+				inside = set(cell for i in chosen for cell in family[i])
+				for j, unit in enumerate(others):
+					if mask >> j & 1:
+						for cell in unit:
+							if cell not in inside and not fix(known, cell, 0):
+								return False
+		return True
+
+	while True:
+		before = len(known)
+		if not basic(known):
+			return None
+		for family, others in [(groups, rows), (groups, columns), (rows, groups), (columns, groups)]:
+			if not pigeonhole(known, family, others):
+				return None
+		if len(known) != before:
+			continue
+		for cell in grid.cells:
+			if cell not in known:
+				trial = dict(known)
+				trial[cell] = 1
+				if not basic(trial):
+					known[cell] = 0
+		if len(known) == before:
+			return known
+
+# Masyu: the edges that are on form a single loop through every circle, which goes straight
+# through white circles and turns one cell before or after them, and turns at black circles and
+# goes straight through the next cell on both sides. Values are 1 for an edge on the loop and 0
+# for one off it, and edges are sorted pairs of cells as from grid.edges(). Repeats these until
+# nothing changes:
+# * Every cell has 0 or 2 edges on, and circles have 2.
+# * White circles: opposite edges are the same, so if one axis is blocked (by the border or an
+#   edge that's off) the loop goes along the other. If the loop goes straight on past one side, it
+#   must turn on the other, so an axis is blocked if it goes straight on past both: the middle one
+#   of three white circles in a line can't be along the line, so neither can the other two.
+#   Two white circles next to each other go the same way (the edge between them is on for both or
+#   neither). Along their line, the loop goes straight through both, so each needs an edge past it
+#   that isn't off, and the loop must turn after it.
+# * Black circles: the loop leaves along one of each pair of opposite directions, and then goes
+#   straight for two edges. A direction is blocked if those two edges aren't both there and not
+#   off, or the next cell is a black circle (it would have to go straight through it), so the
+#   opposite one is taken.
+# * An edge that would close a loop is off, unless that loop would be the whole solution.
+# * An edge is off (or on) if setting it on (or off), followed by the rules above, contradicts.
+def masyu(grid, edges, known=None):
+	known = dict(known or {})
+	edgeset = set(edges)
+	incidence = grid.incidence(edges)
+	circles = { cell: grid[cell] for cell in grid.cells if grid[cell] in "01" }
+	left, right, up, down = (-1, 0), (1, 0), (0, -1), (0, 1)
+
+	def step(cell, direction, n=1):
+		return (cell[0] + direction[0] * n, cell[1] + direction[1] * n)
+
+	# The nth edge from cell in the direction, or None if it's off the grid.
+	def edge(cell, direction, n=1):
+		pair = tuple(sorted([step(cell, direction, n - 1), step(cell, direction, n)]))
+		return pair if pair in edgeset else None
+
+	# For each circle and direction, the first two edges that way (None if they're off the grid),
+	# and the circle in the next cell, if any.
+	lines = {
+		cell: { d: (edge(cell, d), edge(cell, d, 2), circles.get(step(cell, d))) for d in (left, right, up, down) }
+		for cell in circles
+	}
+
+	# Sets an edge's value. Returns False if it already has the other value, or is off the grid
+	# and set on.
+	def fix(known, e, value):
+		if e is None:
+			return value == 0
+		if e in known:
+			return known[e] == value
+		known[e] = value
+		return True
+
+	def cells(known):
+		for cell, around in incidence.items():
+			on = 0
+			free = []
+			for e in around:
+				value = known.get(e)
+				if value is None:
+					free.append(e)
+				elif value:
+					on += 1
+			if on > 2 or (on == 1 and not free):
+				return False
+			if on == 2 or (on == 0 and len(free) == 1 and cell not in circles):
+				for e in free:
+					known[e] = 0
+			elif on == 1 and len(free) == 1:
+				known[free[0]] = 1
+			elif not on and cell in circles:
+				if len(free) < 2:
+					return False
+				if len(free) == 2:
+					for e in free:
+						known[e] = 1
+		return True
+
+	def white(known, cell):
+		line = lines[cell]
+		axes = [(left, right), (up, down)]
+		possible = []
+		for a, b in axes:
+			(near1, far1, circle1), (near2, far2, circle2) = line[a], line[b]
+			# The axis is blocked if an edge on it is off, if the loop would go straight on past both
+			# sides (the next cell is a white circle too, or the edge past it is on), or if a white
+			# circle next to this one has no edge past it.
+			possible.append(near1 is not None and near2 is not None
+				and known.get(near1) != 0 and known.get(near2) != 0
+				and not ((circle1 == "0" or known.get(far1) == 1) and (circle2 == "0" or known.get(far2) == 1))
+				and not (circle1 == "0" and (far1 is None or known.get(far1) == 0))
+				and not (circle2 == "0" and (far2 is None or known.get(far2) == 0)))
+		if not any(possible):
+			return False
+		for (a, b), ok, (c, d) in zip(axes, possible, reversed(axes)):
+			if not ok:
+				if not (fix(known, line[a][0], 0) and fix(known, line[b][0], 0)):
+					return False
+				if not (fix(known, line[c][0], 1) and fix(known, line[d][0], 1)):
+					return False
+			elif known.get(line[a][0]) == 1 or known.get(line[b][0]) == 1:
+				if not (fix(known, line[a][0], 1) and fix(known, line[b][0], 1)):
+					return False
+				# Straight on past one side means a turn past the other.
+				for near, far in ((a, b), (b, a)):
+					if known.get(line[near][1]) == 1 and not fix(known, line[far][1], 0):
+						return False
+		return True
+
+	def black(known, cell):
+		line = lines[cell]
+		def possible(direction):
+			first, second, circle = line[direction]
+			return (first is not None and second is not None and known.get(first) != 0
+				and known.get(second) != 0 and circle != "1")
+		for a, b in ((left, right), (right, left), (up, down), (down, up)):
+			if not possible(a):
+				if not possible(b):
+					return False
+				if not (fix(known, line[a][0], 0) and fix(known, line[b][0], 1)):
+					return False
+			if known.get(line[a][0]) == 1:
+				if not (fix(known, line[a][1], 1) and fix(known, line[b][0], 0)):
+					return False
+		return True
+
+	# Edges that would close a loop too early are off.
+	def loops(known):
+		parent = {}
+		def find(cell):
+			while parent.get(cell, cell) != cell:
+				cell = parent[cell]
+			return cell
+		ons = [e for e, value in known.items() if value == 1]
+		closed = False
+		for a, b in ons:
+			ra, rb = find(a), find(b)
+			if ra == rb:
+				closed = True
+			parent[ra] = rb
+		roots = set(find(a) for a, b in ons)
+		if closed:
+			# The loop is finished, so it must be the whole solution.
+			if len(roots) > 1 or any(find(cell) not in roots for cell in circles):
+				return False
+			for e in edges:
+				if e not in known:
+					known[e] = 0
+			return True
+		for e in edges:
+			a, b = e
+			if e not in known and a in parent and b in parent and find(a) == find(b):
+				whole = len(roots) == 1 and all(find(cell) == find(a) for cell in circles)
+				if not whole:
+					known[e] = 0
+		return True
+
+	def basic(known):
+		while True:
+			before = len(known)
+			if not cells(known):
+				return False
+			for cell, kind in circles.items():
+				if not (white if kind == "0" else black)(known, cell):
+					return False
+			if not loops(known):
+				return False
+			if len(known) == before:
+				return True
+
+	while True:
+		before = len(known)
+		if not basic(known):
+			return None
+		for e in edges:
+			for value in (1, 0):
+				if e not in known:
+					trial = dict(known)
+					trial[e] = value
+					if not basic(trial):
+						known[e] = 1 - value
+						if not basic(known):
+							return None
+		if len(known) == before:
+			return known
+
+# The known cells as rows of 0, 1 and . for unknown.
+def partialgrid(grid, known):
+	return [
+		"".join(str(known[(x, y)]) if (x, y) in known else "." for x in range(len(line)))
+		for y, line in enumerate(grid.lines)
+	]
@@ -0,0 +1,58 @@
+# Checks and times building the Fences edge relations.
+
+# fences.py used to find its edge trios and adjacent edges by comparing every triple and every pair
+# of edges. topology.triangles and topology.adjacentedges build them from the lattice instead.
+# This checks that both give the same sets, on the puzzle's grid and on square boards of hex cells,
+# and times them. The old way is only timed on small boards, since it's cubic in the edges.
+
+import time
+from topology import Grid, HEX, triangles, adjacentedges
+
+SIZES = [5, 10, 15, 20, 25, 30]
+MAXOLDSIZE = 10  # The old way takes 20s at 10 rows, and several minutes at 15.
+
+# The old definitions, from fences.py.
+def oldedgetrios(edges):
+	return set(
+		(edge0, edge1, edge2)
+		for edge0 in edges
+		for edge1 in edges
+		for edge2 in edges
+		if edge0 < edge1 < edge2
+		and len(set(edge0 + edge1 + edge2)) == 3
+	)
+
+def oldaedges(edges):
+	def neighbor(cell0, cell1):
+		x0, y0 = cell0
+		x1, y1 = cell1
+		return (x1 - x0, y1 - y0) in HEX
+	def isadjacent(edge0, edge1):
+		if edge0 == edge1: return False
+		return all(neighbor(cell0, cell1) or cell0 == cell1 for cell0 in edge0 for cell1 in edge1)
+	return set((edge0, edge1) for edge0 in edges for edge1 in edges if isadjacent(edge0, edge1))
+
+def timed(f, *args):
+	start = time.perf_counter()
+	result = f(*args)
+	return result, time.perf_counter() - start
+
+def check(grid):
+	edges = grid.edges(HEX, border=True)
+	trios, tnew = timed(triangles, edges)
+	pairs, anew = timed(adjacentedges, edges)
+	line = "%4d rows %6d edges   new: trios %.4fs  pairs %.4fs" % (grid.H, len(edges), tnew, anew)
+	if grid.H <= MAXOLDSIZE:
+		oldtrios, told = timed(oldedgetrios, edges)
+		oldpairs, aold = timed(oldaedges, edges)
+		assert trios == oldtrios and pairs == oldpairs
+		line += "   old: trios %.4fs  pairs %.4fs   (same)" % (told, aold)
+	print(line)
+
+if __name__ == "__main__":
+	import fences
+	print("puzzle grid:")
+	check(fences.grid)
+	print("square boards:")
+	for size in SIZES:
+		check(Grid("\n".join("0" * size for row in range(size))))
@@ -5,9 +5,13 @@
 # All unshaded cells must be connected (not counting diagonals).
 
 from constraint import Problem, SomeNotInSetConstraint
+from itertools import combinations
+from propagators import ConnectedConstraint
+import stream
+from topology import Grid
 
 # Example from Wikipedia.
-# Solves in 3m
+# Solves in 0.05s
 grid = """
 48163257
 36721654
@@ -18,52 +22,30 @@ grid = """
 64235478
 87142356
 """
-grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
-S = len(grid)
-
-cellnames = [(i,j) for j, row in enumerate(grid) for i, val in enumerate(row)]
-lookup = { (i,j): grid[i][j] for i, j in cellnames }
+grid = Grid(grid)
+cellnames = grid.cells
 
 problem = Problem()
 problem.addVariables(cellnames, [False, True])  # False = unshaded, True = shaded
 
-def isadjacent(cell0, cell1):
-	(i0, j0), (i1, j1) = cell0, cell1
-	return abs(i0 - i1) + abs(j0 - j1) == 1
-
-def issameroworcol(cell0, cell1):
-	(i0, j0), (i1, j1) = cell0, cell1
-	return i0 == i1 or j0 == j1
-
-for cell0 in cellnames:
-	for cell1 in cellnames:
-		if cell0 < cell1:
-			# cells in the same row or column with the same value cannot both be False
-			if issameroworcol(cell0, cell1) and lookup[cell0] == lookup[cell1]:
-				problem.addConstraint(SomeNotInSetConstraint([False]), [cell0, cell1])
-			# adjacent cells cannot both be True
-			if isadjacent(cell0, cell1):
-				problem.addConstraint(SomeNotInSetConstraint([True]), [cell0, cell1])
-
-# All unshaded cells must be connected.
-def allconnected(*values):
-	# Find all connected regions of unshaded cells and count them.
-	regions = []
-	for cellname, value in zip(cellnames, values):
-		if value: continue
-		thisregion = set([cellname]) # All cells encountered so far that are connected to this cell.
-		otherregions = []  # All regions that are not connected to this cell.
-		for region in regions:
-			if any(isadjacent(cellname, p) for p in region):
-				thisregion |= region
-			else:
-				otherregions.append(region)
-		regions = otherregions + [thisregion]
-	return len(regions) <= 1
-problem.addConstraint(allconnected, cellnames)
-
-for solution in problem.getSolutions():
-	sgrid = { cell: "#" if solution[cell] else lookup[cell] for cell in cellnames }
-	print("\n".join(" ".join(sgrid[(i, j)] for j in range(S)) for i in range(S)))
-	print()
-
+# Cells in the same row or column with the same value cannot both be False.
+for line in grid.rows() + grid.columns():
+	samevalue = {}
+	for cell in line:
+		samevalue.setdefault(grid[cell], []).append(cell)
+	for cells in samevalue.values():
+		for cell0, cell1 in combinations(cells, 2):
+			problem.addConstraint(SomeNotInSetConstraint([False]), [cell0, cell1])
+# Adjacent cells cannot both be True.
+for cell0, cell1 in grid.edges():
+	problem.addConstraint(SomeNotInSetConstraint([True]), [cell0, cell1])
+
+# All unshaded cells must be connected. This is checked on partial assignments: as soon as the
+# shaded cells cut off part of the grid, the branch is rejected.
+problem.addConstraint(ConnectedConstraint(grid.neighbors(), blocked=[True]), cellnames)
+
+if __name__ == "__main__":
+	for solution in stream.solutions(problem, cellnames):
+		sgrid = { cell: "#" if shaded else grid[cell] for cell, shaded in zip(cellnames, solution) }
+		print("\n".join(" ".join(sgrid[cell] for cell in row) for row in grid.rows()))
+		print()
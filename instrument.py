@@ -0,0 +1,125 @@
+# Profiling which constraints a solve spends its time in.
+
+# Usage: python3 instrument.py masyu.py [--json profile.json]
+
+# Runs the script as usual, but every constraint added to a Problem is wrapped so that its calls,
+# the time spent in them and how many times it rejected an assignment are counted. Constraints are
+# grouped by where they were added (file, line, and the function or class name), or by a label set
+# with label(constraint, name). A Problem made without a solver gets a SearchSolver that picks
+# variables in BacktrackingSolver's order (ordering="degree"), so the search is the one the script
+# would do, and its stats (nodes, backtracks, max depth) are reported too. The report is printed as
+# a table after the script finishes, or fails, and can also be written as JSON.
+
+# Nothing is wrapped unless enable() is called, which this does before running the script, so
+# there's no cost otherwise.
+
+import argparse, json, os, runpy, sys, time
+from constraint import Constraint, FunctionConstraint, Problem
+from search import SearchSolver
+
+# key: [calls, seconds, rejections]
+records = {}
+solvers = []
+
+# Groups the constraint's calls under name instead of where it was added.
+def label(constraint, name):
+	constraint.label = name
+	return constraint
+
+class Profiled(Constraint):
+	def __init__(self, constraint, key):
+		self.constraint = constraint
+		self.record = records.setdefault(key, [0, 0.0, 0])
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		record = self.record
+		start = time.perf_counter()
+		ok = self.constraint(variables, domains, assignments, forwardcheck)
+		record[1] += time.perf_counter() - start
+		record[0] += 1
+		if not ok:
+			record[2] += 1
+		return ok
+
+	# The constraint may remove itself from the lists, which hold this wrapper instead, so it's
+	# swapped in while it runs.
+	def preProcess(self, variables, domains, constraints, vconstraints):
+		mine = (self, variables)
+		theirs = (self.constraint, variables)
+		lists = [constraints] + [vconstraints[variable] for variable in variables]
+		for items in lists:
+			items[:] = [theirs if item == mine else item for item in items]
+		self.constraint.preProcess(variables, domains, constraints, vconstraints)
+		for items in lists:
+			items[:] = [mine if item == theirs else item for item in items]
+
+# Where the constraint is being added from, with what it is.
+def origin(constraint, frame):
+	if isinstance(constraint, FunctionConstraint):
+		name = constraint._func.__name__
+	else:
+		name = type(constraint).__name__
+	return "%s:%d %s" % (os.path.basename(frame.f_code.co_filename), frame.f_lineno, name)
+
+def enable():
+	addConstraint = Problem.addConstraint
+	init = Problem.__init__
+	def profiledAddConstraint(problem, constraint, variables=None):
+		if not isinstance(constraint, Constraint) and callable(constraint):
+			constraint = FunctionConstraint(constraint)
+		key = getattr(constraint, "label", None) or origin(constraint, sys._getframe(1))
+		addConstraint(problem, Profiled(constraint, key), variables)
+	def profiledInit(problem, solver=None):
+		init(problem, solver or SearchSolver(ordering="degree"))
+		problem.setSolver(problem.getSolver())
+	def setSolver(problem, solver):
+		problem._solver = solver
+		if isinstance(solver, SearchSolver) and solver not in solvers:
+			solvers.append(solver)
+	Problem.addConstraint = profiledAddConstraint
+	Problem.__init__ = profiledInit
+	Problem.setSolver = setSolver
+
+def report():
+	total = sum(record[1] for record in records.values())
+	constraints = [
+		{ "constraint": key, "calls": calls, "seconds": seconds, "rejections": rejections }
+		for key, (calls, seconds, rejections) in sorted(records.items(), key=lambda item: -item[1][1])
+	]
+	search = [dict(solver.stats) for solver in solvers if solver.stats]
+	return { "constraints": constraints, "seconds": total, "search": search }
+
+# Constraints that were never called (e.g. InSetConstraint, which the solver applies before
+# searching) are left out.
+def table(report):
+	lines = ["%-50s %10s %9s %6s %10s %7s" % ("constraint", "calls", "time", "%", "rejected", "%")]
+	for row in report["constraints"]:
+		if not row["calls"]:
+			continue
+		lines.append("%-50s %10d %8.3fs %5.1f%% %10d %6.1f%%" % (
+			row["constraint"][:50], row["calls"], row["seconds"],
+			100 * row["seconds"] / (report["seconds"] or 1), row["rejections"],
+			100 * row["rejections"] / (row["calls"] or 1)))
+	lines.append("%-50s %10s %8.3fs" % ("total", "", report["seconds"]))
+	for k, stats in enumerate(report["search"]):
+		lines.append("search %d: %s" % (k + 1, ", ".join("%s %d" % item for item in sorted(stats.items()))))
+	return "\n".join(lines)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("script")
+	parser.add_argument("--json", help="also write the report to this file")
+	args = parser.parse_args()
+
+	enable()
+	sys.argv = [args.script]
+	sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+	try:
+		runpy.run_path(args.script, run_name="__main__")
+	finally:
+		result = report()
+		print()
+		print(table(result))
+		if args.json:
+			with open(args.json, "w") as f:
+				json.dump(result, f, indent=1)
@@ -5,10 +5,18 @@
 # a circle. If the circle is white it must pass straight through. If the circle is black it must
 # make a 90 degree turn there.
 
+import sys, time
 from constraint import *
+from cnf import SatSolver
+import deduction
+from memo import PureConstraint
+from propagators import LoopConstraint
+from search import SearchSolver
+from topology import Grid
 
 # 0 = white circle, 1 = black circle
-# Example from Wikipedia. Sovles in about 5 minutes.
+# Example from Wikipedia. The deductions in deduction.py find every edge in 0.06s, so there's
+# nothing left to search. (Without them, SearchSolver solves it in 0.2s.)
 grid = """
 ..0.0.....
 ....0...1.
@@ -32,131 +40,161 @@ if False:
 	.1....
 	..0...
 	"""
-grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
+# 15x15, generated. Deduces 160 of 420 edges in 3s, and then SearchSolver takes minutes, but
+# cnf.SatSolver (SAT = True) solves it in 0.2s.
+grid15 = """
+.0..0.......0..
+........0.0...0
+1.0....1..1..1.
+.0..1.1.0......
+........0....0.
+...0......11...
+0..01.1...1....
+0.0..0.......0.
+..0.....0..0.0.
+..0......1...1.
+....000........
+..0.....00..0.0
+.0....0.....1..
+.0..0....00....
+..0..1.....0...
+"""
+if False:
+	grid = grid15
+grid = Grid(grid)
 
-W, H = len(grid[0]), len(grid)  # size of grid
-cellnames = [(x, y) for x in range(W) for y in range(H)]
-# Define an edge variable as an ordered pair of the two cells it connects.
-edges = [
-	((x, y), (x+1, y)) for x in range(W-1) for y in range(H)
-] + [
-	((x, y), (x, y+1)) for x in range(W) for y in range(H-1)
-]
+SAT = False  # Solve with cnf.SatSolver instead of SearchSolver.
 
-problem = Problem()
-problem.addVariables(edges, [0, 1])  # 0 = no line, 1 = line
+# The problem for a grid, with the edges in known only getting their known value.
+def model(grid, known=None):
+	if known is None:
+		known = {}
+	W, H = grid.W, grid.H  # size of grid
+	cellnames = grid.cells
+	# Define an edge variable as an ordered pair of the two cells it connects.
+	edges = grid.edges()
+	# Edges touching each cell.
+	incidence = grid.incidence(edges)
 
-# Every cell must have exactly 0 or 2 edges with a line.
-for cell in cellnames:
-	celledges = [edge for edge in edges if cell in edge]
-	problem.addConstraint(lambda *values: sum(values) in (0, 2), celledges)
+	problem = Problem(SearchSolver())
+	for edge in edges:
+		problem.addVariable(edge, [known[edge]] if edge in known else [0, 1])  # 0 = no line, 1 = line
 
-for x, y in cellnames:
-	if grid[y][x] == ".":
-		continue
+	# Every cell must have exactly 0 or 2 edges with a line.
+	for cell in cellnames:
+		problem.addConstraint(PureConstraint(lambda *values: sum(values) in (0, 2)), incidence[cell])
 
-	# edges in each of the four directions
-	left = lambda n=1: ((x-n, y), (x-n+1, y))
-	right = lambda n=1: ((x+n-1, y), (x+n, y))
-	up = lambda n=1: ((x, y-n), (x, y-n+1))
-	down = lambda n=1: ((x, y+n-1), (x, y+n))
-	celledges = [edge for edge in edges in cell in edge]
+	for x, y in cellnames:
+		if grid[x, y] == ".":
+			continue
 
-	if grid[y][x] == "0":
-		# White circles: the chain must pass straight through the circle.
-		problem.addConstraint(ExactSumConstraint(2), celledges)
-		# Thus pairs of opposite edges must be the same.
-		if 0 < x < W-1:
-			problem.addConstraint(AllEqualConstraint(), [left(), right()])
-		if 0 < y < H-1:
-			problem.addConstraint(AllEqualConstraint(), [up(), down()])
-		# And any edge opposite the side of the grid must be empty.
-		if x == 0:
-			problem.addConstraint(InSetConstraint([0]), [right()])
-		if x == W-1:
-			problem.addConstraint(InSetConstraint([0]), [left()])
-		if y == 0:
-			problem.addConstraint(InSetConstraint([0]), [down()])
-		if y == H-1:
-			problem.addConstraint(InSetConstraint([0]), [up()])
-		# The chain must turn either before or after passing through the white circle.
-		# Thus you can't have 4 edges in a row centered on the circle.
-		if 1 < x < W-2:
-			problem.addConstraint(SomeNotInSetConstraint([1]), [left(2), left(), right(), right(2)])
-		if 1 < y < H-2:
-			yedges = [((x, y+b), (x, y+b+1)) for b in (-2, -1, 0, 1)]
-			problem.addConstraint(SomeNotInSetConstraint([1]), [up(2), up(), down(), down(2)])
+		# edges in each of the four directions
+		left = lambda n=1: ((x-n, y), (x-n+1, y))
+		right = lambda n=1: ((x+n-1, y), (x+n, y))
+		up = lambda n=1: ((x, y-n), (x, y-n+1))
+		down = lambda n=1: ((x, y+n-1), (x, y+n))
+		celledges = incidence[(x, y)]
 
-	if grid[y][x] == "1":
-		# Black circles: the chain must pass through the circle and turn there.
-		problem.addConstraint(ExactSumConstraint(2), celledges)
-		# Thus pairs of opposite edges must be different.
-		if 0 < x < W-1:
-			problem.addConstraint(AllDifferentConstraint(), [left(), right()])
-		if 0 < y < H-1:
-			problem.addConstraint(AllDifferentConstraint(), [up(), down()])
-		# And any edge opposite the side of the grid must be filled.
-		if x == 0:
-			problem.addConstraint(InSetConstraint([1]), [right()])
-		if x == W-1:
-			problem.addConstraint(InSetConstraint([1]), [left()])
-		if y == 0:
-			problem.addConstraint(InSetConstraint([1]), [down()])
-		if y == H-1:
-			problem.addConstraint(InSetConstraint([1]), [up()])
-		# The chain can't turn right before or after passing through the black circle.
-		# Thus if the edge leading out of the circle is filled, so must the next one be.
-		# If this takes it off the grid, then the edge can't be filled at all.
-		imp = lambda p, q: not p or q
-		if x == 1:
-			problem.addConstraint(InSetConstraint([0]), [left()])
-		elif x > 1:
-			problem.addConstraint(imp, [left(), left(2)])
-		if x == W-2:
-			problem.addConstraint(InSetConstraint([0]), [right()])
-		elif x < W-2:
-			problem.addConstraint(imp, [right(), right(2)])
-		if y == 1:
-			problem.addConstraint(InSetConstraint([0]), [up()])
-		elif y > 1:
-			problem.addConstraint(imp, [up(), up(2)])
-		if y == H-2:
-			problem.addConstraint(InSetConstraint([0]), [down()])
-		elif y < H-2:
-			problem.addConstraint(imp, [down(), down(2)])
-		
-# All edges must be connected.
-def isadjacent(edge0, edge1):
-	return any(cell in edge1 for cell in edge0)
-def allconnected(*values):
-	# Find all connected regions of edges and count them.
-	regions = []
-	for edge, value in zip(edges, values):
-		if not value: continue
-		thisregion = set([edge]) # All edges encountered so far that are connected to this edge.
-		otherregions = []  # All regions that are not connected to this edge.
-		for region in regions:
-			if any(isadjacent(edge, p) for p in region):
-				thisregion |= region
-			else:
-				otherregions.append(region)
-		regions = otherregions + [thisregion]
-	return len(regions) <= 1
-problem.addConstraint(allconnected, edges)
+		if grid[x, y] == "0":
+			# White circles: the chain must pass straight through the circle.
+			problem.addConstraint(ExactSumConstraint(2), celledges)
+			# Thus pairs of opposite edges must be the same.
+			if 0 < x < W-1:
+				problem.addConstraint(AllEqualConstraint(), [left(), right()])
+			if 0 < y < H-1:
+				problem.addConstraint(AllEqualConstraint(), [up(), down()])
+			# And any edge opposite the side of the grid must be empty.
+			if x == 0:
+				problem.addConstraint(InSetConstraint([0]), [right()])
+			if x == W-1:
+				problem.addConstraint(InSetConstraint([0]), [left()])
+			if y == 0:
+				problem.addConstraint(InSetConstraint([0]), [down()])
+			if y == H-1:
+				problem.addConstraint(InSetConstraint([0]), [up()])
+			# The chain must turn either before or after passing through the white circle.
+			# Thus you can't have 4 edges in a row centered on the circle.
+			if 1 < x < W-2:
+				problem.addConstraint(SomeNotInSetConstraint([1]), [left(2), left(), right(), right(2)])
+			if 1 < y < H-2:
+				yedges = [((x, y+b), (x, y+b+1)) for b in (-2, -1, 0, 1)]
+				problem.addConstraint(SomeNotInSetConstraint([1]), [up(2), up(), down(), down(2)])
 
-for solution in problem.getSolutions():
-	lines = []
-	for y in range(H):
-		line = ""
-		for x in range(W):
-			line += grid[y][x]
-			if x < W - 1:
-				line += "#" if solution[((x,y), (x+1,y))] else " "
-		lines.append(line)
-		if y < H - 1:
-			chars = ["#" if solution[((x,y), (x,y+1))] else " " for x in range(W)]
-			lines.append(" ".join(chars))
-	print("\n".join(" ".join(line) for line in lines))
-	print()
+		if grid[x, y] == "1":
+			# Black circles: the chain must pass through the circle and turn there.
+			problem.addConstraint(ExactSumConstraint(2), celledges)
+			# Thus pairs of opposite edges must be different.
+			if 0 < x < W-1:
+				problem.addConstraint(AllDifferentConstraint(), [left(), right()])
+			if 0 < y < H-1:
+				problem.addConstraint(AllDifferentConstraint(), [up(), down()])
+			# And any edge opposite the side of the grid must be filled.
+			if x == 0:
+				problem.addConstraint(InSetConstraint([1]), [right()])
+			if x == W-1:
+				problem.addConstraint(InSetConstraint([1]), [left()])
+			if y == 0:
+				problem.addConstraint(InSetConstraint([1]), [down()])
+			if y == H-1:
+				problem.addConstraint(InSetConstraint([1]), [up()])
+			# The chain can't turn right before or after passing through the black circle.
+			# Thus if the edge leading out of the circle is filled, so must the next one be.
+			# If this takes it off the grid, then the edge can't be filled at all.
+			imp = lambda p, q: not p or q
+			if x == 1:
+				problem.addConstraint(InSetConstraint([0]), [left()])
+			elif x > 1:
+				problem.addConstraint(PureConstraint(imp), [left(), left(2)])
+			if x == W-2:
+				problem.addConstraint(InSetConstraint([0]), [right()])
+			elif x < W-2:
+				problem.addConstraint(PureConstraint(imp), [right(), right(2)])
+			if y == 1:
+				problem.addConstraint(InSetConstraint([0]), [up()])
+			elif y > 1:
+				problem.addConstraint(PureConstraint(imp), [up(), up(2)])
+			if y == H-2:
+				problem.addConstraint(InSetConstraint([0]), [down()])
+			elif y < H-2:
+				problem.addConstraint(PureConstraint(imp), [down(), down(2)])
 
+	# All edges must form a single loop through every circle. This is checked on partial assignments,
+	# so a loop that closes too early is rejected as soon as its last edge is placed.
+	circles = [(x, y) for x, y in cellnames if grid[x, y] != "."]
+	problem.addConstraint(LoopConstraint({ edge: edge for edge in edges }, circles), edges)
+	return problem
 
+# Edges that can be deduced before searching only get their known value. If deducing finds a
+# contradiction (known is None), there's no solution: importing this raises ValueError, and run as
+# a script, it prints that instead.
+start = time.perf_counter()
+known = deduction.masyu(grid, grid.edges())
+deducetime = time.perf_counter() - start
+if known is not None:
+	problem = model(grid, known)
+elif __name__ != "__main__":
+	raise ValueError("the Masyu grid has no solution")
+
+if __name__ == "__main__":
+	if known is None:
+		print("No solution: deducing found a contradiction in %.3fs" % deducetime)
+		sys.exit()
+	W, H = grid.W, grid.H
+	print("Deduced %d of %d edges in %.3fs" % (len(known), len(grid.edges()), deducetime))
+	print()
+	if SAT:
+		problem.setSolver(SatSolver())
+	for solution in problem.getSolutions():
+		lines = []
+		for y in range(H):
+			line = ""
+			for x in range(W):
+				line += grid[x, y]
+				if x < W - 1:
+					line += "#" if solution[((x,y), (x+1,y))] else " "
+			lines.append(line)
+			if y < H - 1:
+				chars = ["#" if solution[((x,y), (x,y+1))] else " " for x in range(W)]
+				lines.append(" ".join(chars))
+		print("\n".join(" ".join(line) for line in lines))
+		print()
@@ -0,0 +1,86 @@
+# N queens problem, without the CSP solver.
+# Place N queens on an NxN chessboard so that no two queens are attacking each other.
+
+# This version keeps the columns and the two diagonals that are under attack as integer bitmasks,
+# one bit per column, and places one queen per row. Moving down a row shifts the diagonal masks by
+# one bit, so checking a square is a single AND.
+
+# Only queens in the left half of the first row are searched, since every other solution is the
+# mirror image of one of those. Each first-row column is a separate job for a process pool.
+
+from functools import partial
+from multiprocessing import Pool
+
+# Counts only, with a single process:
+# N = 12 solves in 0.7s
+# N = 13 solves in 4s
+# N = 14 solves in 22s
+# There are (N+1)/2 jobs, so with enough cores the time drops to roughly that of the slowest job.
+N = 14
+COUNT_ONLY = True  # If False, print every solution as a tuple of the queen's column in each row.
+PROCESSES = None  # None = one per CPU.
+
+# Number of ways to finish the board, given the masks of columns and diagonals under attack in the
+# current row.
+def count(full, cols, ld, rd):
+	if cols == full:
+		return 1
+	total = 0
+	free = full & ~(cols | ld | rd)
+	while free:
+		bit = free & -free
+		free ^= bit
+		total += count(full, cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1)
+	return total
+
+# Every way to finish the board, as lists of the columns of the queens placed from this row down.
+def finish(full, cols, ld, rd):
+	if cols == full:
+		yield []
+		return
+	free = full & ~(cols | ld | rd)
+	while free:
+		bit = free & -free
+		free ^= bit
+		for rest in finish(full, cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1):
+			yield [bit.bit_length() - 1] + rest
+
+# The masks after placing the first row's queen in the given column.
+def firstrow(N, col):
+	bit = 1 << col
+	return (1 << N) - 1, bit, (bit << 1) & ((1 << N) - 1), bit >> 1
+
+# Number of solutions with the first row's queen in the given column, including mirror images.
+def countcolumn(N, col):
+	n = count(*firstrow(N, col))
+	return n if 2 * col + 1 == N else 2 * n
+
+# Solutions with the first row's queen in the given column, and their mirror images.
+def solvecolumn(N, col):
+	solutions = []
+	for rest in finish(*firstrow(N, col)):
+		solution = tuple([col] + rest)
+		solutions.append(solution)
+		if 2 * col + 1 != N:
+			solutions.append(tuple(N - 1 - x for x in solution))
+	return solutions
+
+# Columns of the first row that need to be searched: the left half, plus the middle if N is odd.
+def halfcolumns(N):
+	return list(range((N + 1) // 2))
+
+def countall(N, processes=None):
+	with Pool(processes) as pool:
+		return sum(pool.imap_unordered(partial(countcolumn, N), halfcolumns(N)))
+
+def solveall(N, processes=None):
+	with Pool(processes) as pool:
+		for solutions in pool.imap(partial(solvecolumn, N), halfcolumns(N)):
+			yield from solutions
+
+if __name__ == "__main__":
+	if COUNT_ONLY:
+		print(countall(N, PROCESSES))
+	else:
+		for solution in solveall(N, PROCESSES):
+			print(solution)
@@ -2,22 +2,60 @@
 # Place N queens on an NxN chessboard so that no two queens are attacking each other.
 # Finds all solutions. There are multiple solutions for N >= 4.
 
+from functools import partial
 from constraint import Problem
+from memo import PureConstraint
+import parallel, stream
+from symmetry import SQUARE, breaksymmetry, expand
 
 # N = 8 solves in 0.1s
 # N = 10 solves in 0.9s
 # N = 12 solves in 21s
 # N = 14 solves in 11m
 N = 12
+PARALLEL = False  # If True, split the search over a process pool. See parallel.py.
+COUNT_ONLY = False  # If True, only print the number of solutions.
+SYMMETRY = False  # If True, only search for one of each set of rotated and mirrored solutions.
 
-problem = Problem()
-values = list(range(N))
-problem.addVariables(values, values)
 def ok(d):
 	return lambda x, y: x - y not in (-d, 0, d)
-for row1 in values:
-	for row2 in values:
-		if row1 < row2:
-			problem.addConstraint(ok(row2 - row1), (row1, row2))
-for solution in problem.getSolutions():
-	print(solution)
+
+# With symmetry, only the least of each set of symmetric solutions (see symmetry.py).
+def model(N, symmetry=False):
+	problem = Problem()
+	values = list(range(N))
+	problem.addVariables(values, values)
+	for row1 in values:
+		for row2 in values:
+			if row1 < row2:
+				problem.addConstraint(PureConstraint(ok(row2 - row1)), (row1, row2))
+	if symmetry:
+		breaksymmetry(problem, symmetries(N), values)
+	return problem
+
+# Where each rotation and mirroring of the board moves a queen, as (row, column) pairs. A queen
+# in row y and column x is at cell (x, y).
+def symmetries(N):
+	return [
+		{ (row, col): tuple(reversed(move(col, row, N))) for row in range(N) for col in range(N) }
+		for move in SQUARE.values()
+	]
+
+# Solutions are printed as tuples of the queen's column in each row.
+if __name__ == "__main__":
+	if SYMMETRY:
+		# The rest of the solutions come from the least ones, each rotated and mirrored.
+		least = [dict(enumerate(solution)) for solution in stream.solutions(model(N, True), range(N))]
+		solutions = [tuple(solution[row] for row in range(N)) for solution in expand(least, symmetries(N))]
+		if not COUNT_ONLY:
+			for solution in sorted(solutions):
+				print(solution)
+		print("%d solutions, %d up to symmetry" % (len(solutions), len(least)))
+	elif COUNT_ONLY:
+		print(parallel.count(partial(model, N)) if PARALLEL else stream.count(model(N)))
+	elif PARALLEL:
+		for solution in parallel.solutions(partial(model, N)):
+			print(tuple(solution[row] for row in range(N)))
+	else:
+		for solution in stream.solutions(model(N), range(N)):
+			print(solution)
@@ -0,0 +1,443 @@
+# Custom constraints for python-constraint that prune partial assignments.
+
+# The built-in FunctionConstraint only decides once every variable in its scope is assigned, so a
+# global rule like "all unshaded cells are connected" over the whole grid is only checked at the
+# very bottom of the search tree. The constraints here look at whatever has been assigned so far
+# and, when forward checking, hide values from the domains of unassigned variables.
+
+# python-constraint gives a constraint no notice when a variable is unassigned (it just restores
+# the domains on backtrack), so these constraints keep no state between calls. Instead each call
+# is linear in the size of its scope, using neighbor lists that are computed once up front.
+
+from constraint import Constraint
+
+
+# All variables whose value is not in blocked must form a single connected region. neighbors maps
+# each variable to the variables adjacent to it.
+# e.g. Hitori: variables are cells, blocked = [True] (shaded), neighbors are orthogonal.
+class ConnectedConstraint(Constraint):
+	def __init__(self, neighbors, blocked=(True,)):
+		self._neighbors = neighbors
+		self._blocked = blocked
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		blocked = self._blocked
+		neighbors = self._neighbors
+		isblocked = lambda v: v in assignments and assignments[v] in blocked
+		isopen = lambda v: v in assignments and assignments[v] not in blocked
+		opened = [v for v in variables if isopen(v)]
+		if not opened:
+			return True
+		# Flood fill from one open variable through everything that's not blocked. This is the area
+		# the region could still possibly cover.
+		root = opened[0]
+		seen = set([root])
+		stack = [root]
+		while stack:
+			v = stack.pop()
+			for other in neighbors[v]:
+				if other not in seen and not isblocked(other):
+					seen.add(other)
+					stack.append(other)
+		# Blocked variables have cut the open variables into pieces.
+		if not all(v in seen for v in opened):
+			return False
+		if forwardcheck:
+			# Anything outside the reachable area must be blocked.
+			for v in variables:
+				if v not in seen and v not in assignments:
+					if not self._hideopen(domains[v]):
+						return False
+			# Any unassigned variable whose removal would separate open variables must stay open.
+			for v in self._articulations(root, seen, isopen):
+				if v not in assignments and not self._hideblocked(domains[v]):
+					return False
+		return True
+
+	def _hideopen(self, domain):
+		for value in domain[:]:
+			if value not in self._blocked:
+				domain.hideValue(value)
+		return bool(domain)
+
+	def _hideblocked(self, domain):
+		for value in domain[:]:
+			if value in self._blocked:
+				domain.hideValue(value)
+		return bool(domain)
+
+	# Tarjan's algorithm over the reachable area, starting from an open variable. Returns the
+	# articulation points that have at least one open variable cut off behind them. (The root is
+	# open, so it's always on the other side of the cut.)
+	def _articulations(self, root, seen, isopen):
+		neighbors = self._neighbors
+		disc = { root: 0 }
+		low = { root: 0 }
+		count = { root: int(isopen(root)) }  # number of open variables in each DFS subtree
+		cuts = []
+		stack = [(root, None, iter(neighbors[root]))]
+		while stack:
+			v, parent, others = stack[-1]
+			for other in others:
+				if other not in seen:
+					continue
+				if other not in disc:
+					disc[other] = low[other] = len(disc)
+					count[other] = int(isopen(other))
+					stack.append((other, v, iter(neighbors[other])))
+					break
+				if other != parent:
+					low[v] = min(low[v], disc[other])
+			else:
+				stack.pop()
+				if parent is not None:
+					low[parent] = min(low[parent], low[v])
+					count[parent] += count[v]
+					if parent != root and count[v] and low[v] >= disc[parent]:
+						cuts.append(parent)
+		return cuts
+
+
+# The variables are edges, and those with a true value must form a single closed loop. ends maps
+# each variable to the pair of nodes it joins. Every node in required must be on the loop.
+# e.g. Masyu: variables are edges between adjacent cells, nodes are cells, required are circles.
+# A partial assignment is a set of path fragments. It's rejected if any node has more than two
+# edges, or if a fragment has been closed into a loop while some other edge or required node is
+# left outside it. A complete one is also rejected if its edges aren't a closed loop (unless none
+# are on and no node is required). When forward checking, edges that would do any of those things
+# are removed, and a branch is rejected once a fragment end or a required node has no way left to
+# continue.
+class LoopConstraint(Constraint):
+	def __init__(self, ends, required=()):
+		self._ends = ends
+		self._required = set(required)
+		# Edge variables touching each node.
+		self._incident = {}
+		for edge, nodes in ends.items():
+			for node in nodes:
+				self._incident.setdefault(node, []).append(edge)
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		ends = self._ends
+		# Union-find over nodes, built from the edges that are on.
+		parent = {}
+		def find(node):
+			root = node
+			while parent.get(root, root) != root:
+				root = parent[root]
+			while node != root:
+				parent[node], node = root, parent[node]
+			return root
+		degree = {}
+		ons = []
+		closed = None  # the root of the fragment that has been closed into a loop, if any
+		missing = False  # whether some edge is unassigned
+		for edge in variables:
+			if edge not in assignments:
+				missing = True
+				continue
+			if not assignments[edge]:
+				continue
+			ons.append(edge)
+			a, b = ends[edge]
+			for node in (a, b):
+				degree[node] = degree.get(node, 0) + 1
+				if degree[node] > 2:
+					return False
+			ra, rb = find(a), find(b)
+			if ra == rb:
+				if closed is not None:
+					return False
+				closed = ra
+			else:
+				parent[ra] = rb
+		if closed is not None:
+			closed = find(closed)
+			# Closing the loop must have used up every edge that's on and every required node.
+			if any(find(ends[edge][0]) != closed for edge in ons):
+				return False
+			if any(node not in degree or find(node) != closed for node in self._required):
+				return False
+		elif not missing and (ons or self._required):
+			return False
+		if forwardcheck:
+			# Only the single fragment containing everything so far may be closed.
+			roots = set(find(ends[edge][0]) for edge in ons)
+			complete = len(roots) == 1 and all(node in degree for node in self._required)
+			if complete:
+				root, = roots
+				complete = all(find(node) == root for node in self._required)
+			for edge in variables:
+				if edge in assignments:
+					continue
+				a, b = ends[edge]
+				hide = closed is not None or degree.get(a, 0) == 2 or degree.get(b, 0) == 2
+				if not hide and a in degree and b in degree and find(a) == find(b):
+					hide = not complete
+				if hide and not self._hideon(domains[edge]):
+					return False
+			# Every fragment end needs an edge left to continue, and every required node not yet
+			# visited needs two.
+			if closed is None:
+				for node in set(degree) | self._required:
+					need = 2 - degree.get(node, 0)
+					free = [edge for edge in self._incident.get(node, ()) if edge not in assignments]
+					if need and sum(any(domains[edge]) for edge in free) < need:
+						return False
+		return True
+
+	def _hideon(self, domain):
+		for value in domain[:]:
+			if value:
+				domain.hideValue(value)
+		return bool(domain)
+
+
+# Each variable's value counts for some number of items, and the counts must sum to exactly total.
+# counts has one entry per variable, mapping (or indexing) its values to their counts. If counts
+# is not given, each value counts for itself, like ExactSumConstraint.
+# e.g. Star Battle: for a row-layout model, the count for a row is the number of stars its layout
+# puts in the column or group. For a cell model, cells are 0 or 1 and count for themselves.
+# Unlike ExactSumConstraint this checks both bounds on partial assignments: the counts assigned so
+# far, plus the least and the most the unassigned variables could still add. When forward checking,
+# values that would push either bound past total are removed.
+class CountConstraint(Constraint):
+	def __init__(self, total, counts=None):
+		self._total = total
+		self._counts = counts
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		return _count(self._total, self._counts, variables, domains, assignments, forwardcheck)
+
+
+# The first variable is a condition: when it has the value when, the counts of the rest must sum to
+# exactly total, as in CountConstraint. Otherwise the rest can be anything.
+# e.g. Fences: a sad cell (False) has as many sad neighbors as its number, so the variables are the
+# cell and its neighbors, when is False, and each neighbor counts 1 if it's sad.
+# Once the condition has that value, this prunes like CountConstraint. Before that, if the rest
+# can no longer make total, the value is hidden from the condition when forward checking.
+class CountIfConstraint(Constraint):
+	def __init__(self, when, total, counts=None):
+		self._when = when
+		self._total = total
+		self._counts = counts
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		condition = variables[0]
+		when = self._when
+		if condition in assignments:
+			if assignments[condition] != when:
+				return True
+			return _count(self._total, self._counts, variables[1:], domains, assignments, forwardcheck)
+		if when not in domains[condition] or _count(self._total, self._counts, variables[1:], domains, assignments):
+			return True
+		if forwardcheck:
+			domains[condition].hideValue(when)
+			return bool(domains[condition])
+		return True
+
+
+# Whether the counts of the variables' values can still sum to exactly total (see CountConstraint),
+# hiding the values that can't when forward checking.
+def _count(target, counts, variables, domains, assignments, forwardcheck=False):
+	counts = counts or [None] * len(variables)
+	assigned = 0
+	unassigned = []
+	for variable, count in zip(variables, counts):
+		if variable in assignments:
+			value = assignments[variable]
+			assigned += value if count is None else count[value]
+		else:
+			values = domains[variable]
+			if not values:
+				return False
+			weights = values if count is None else [count[value] for value in values]
+			unassigned.append((variable, count, min(weights), max(weights)))
+	low = assigned + sum(u[2] for u in unassigned)
+	high = assigned + sum(u[3] for u in unassigned)
+	if not low <= target <= high:
+		return False
+	if forwardcheck:
+		for variable, count, least, most in unassigned:
+			domain = domains[variable]
+			for value in domain[:]:
+				weight = value if count is None else count[value]
+				if low - least + weight > target or high - most + weight < target:
+					domain.hideValue(value)
+			if not domain:
+				return False
+	return True
+
+
+# The variables are index, result, and then an array of variables: array[index] must equal result.
+# The index's values are positions in the array.
+# e.g. Compromised: index is a trait (which spy has it), the array is one feature for each spy, and
+# result is whether the spy with the trait has the feature.
+# This propagates both ways. Positions whose array variable can't take any of the result's values
+# are removed from the index's domain, the result is narrowed to what the remaining positions
+# allow, and once only one position is left its array variable is narrowed to match the result.
+class ElementConstraint(Constraint):
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		index, result = variables[:2]
+		array = variables[2:]
+		values = lambda v: [assignments[v]] if v in assignments else domains[v]
+		results = values(result)
+		possible = [i for i in values(index) if any(value in results for value in values(array[i]))]
+		if not possible:
+			return False
+		if forwardcheck:
+			if index not in assignments:
+				for i in domains[index][:]:
+					if i not in possible:
+						domains[index].hideValue(i)
+			if result not in assignments:
+				allowed = set(value for i in possible for value in values(array[i]))
+				for value in domains[result][:]:
+					if value not in allowed:
+						domains[result].hideValue(value)
+				if not domains[result]:
+					return False
+			if len(possible) == 1:
+				element = array[possible[0]]
+				if element not in assignments:
+					results = values(result)
+					for value in domains[element][:]:
+						if value not in results:
+							domains[element].hideValue(value)
+					if not domains[element]:
+						return False
+		return True
+
+
+# A clue at one end of a line of cells: the first letter seen from that end must be clue.
+# positions maps each letter to its possible places along the line, nearest the end first, as
+# (variable, value) pairs: the letter is in the kth cell if the kth variable has the kth value.
+# Each letter must appear exactly once on the line.
+# e.g. ABC End View: for a row, a letter's variable is its column in that row, so the pairs are
+# (letter + row, col) for each col. For a column, the pairs are (letter + row, col) for each row.
+# Every other letter must come after the clue's letter, so the clue's letter can't be at or past
+# the last place another letter could be, and other letters can't be at or before the first place
+# the clue's letter could be. And there's no room for the clue's letter past len(line) - letters.
+class EndViewConstraint(Constraint):
+	def __init__(self, clue, positions):
+		self._clue = clue
+		self._positions = positions
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		clue = self._clue
+		positions = self._positions
+		def possible(pair):
+			variable, value = pair
+			if variable in assignments:
+				return assignments[variable] == value
+			return value in domains[variable]
+		# Only the clue's first place and the other letters' last places matter.
+		first = next((k for k, pair in enumerate(positions[clue]) if possible(pair)), None)
+		if first is None:
+			return False
+		last = len(positions[clue]) - len(positions)
+		for letter, pairs in positions.items():
+			if letter == clue:
+				continue
+			k = len(pairs) - 1
+			while k > first and not possible(pairs[k]):
+				k -= 1
+			if k <= first:
+				return False
+			last = min(last, k - 1)
+		if first > last:
+			return False
+		if forwardcheck:
+			# Nothing else at or before the clue's first place, and the clue's letter before every
+			# other letter's last place.
+			for letter, pairs in positions.items():
+				hidden = pairs[last + 1:] if letter == clue else pairs[:first + 1]
+				for variable, value in hidden:
+					if variable in assignments:
+						if assignments[variable] == value:
+							return False
+					elif value in domains[variable]:
+						domains[variable].hideValue(value)
+						if not domains[variable]:
+							return False
+		return True
+
+
+# The variables must not all have the values they have in solution (a dict), so a search with it
+# finds any solution but that one.
+# e.g. checking that a puzzle's solution is unique once one is known, as clues.py does.
+# This can only fail once every variable but one has its value from solution. When forward
+# checking, that one's value is then hidden.
+class ExcludeConstraint(Constraint):
+	def __init__(self, solution):
+		self._solution = solution
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		solution = self._solution
+		free = None
+		for variable in variables:
+			if variable in assignments:
+				if assignments[variable] != solution[variable]:
+					return True
+			elif free is not None or solution[variable] not in domains[variable]:
+				return True
+			else:
+				free = variable
+		if free is None:
+			return False
+		if forwardcheck:
+			domains[free].hideValue(solution[free])
+			if not domains[free]:
+				return False
+		return True
+
+
+# The variables, in order, must have values no greater (lexicographically) than they'd have after
+# a symmetry of the puzzle, so only the least of each set of symmetric solutions is found.
+# images maps each (variable, value) to what the symmetry turns it into, and must turn every
+# solution into a solution.
+# e.g. N queens: a queen at (row, column) is (variable, value), and mirroring the board left to
+# right turns it into (row, N - 1 - column).
+# The comparison goes along the variables while both the value and the value after the symmetry
+# are known and equal. When forward checking, if it stops at a variable that isn't assigned yet,
+# values more than its value after the symmetry are hidden. If it stops at one whose value after
+# the symmetry isn't known yet, the values that would make that less than its value are hidden.
+class LexLeaderConstraint(Constraint):
+	def __init__(self, images):
+		self._images = images
+		# For each variable, each of its values after the symmetry and what it was before.
+		self._before = {}
+		for (variable, value), (image, imagevalue) in images.items():
+			self._before.setdefault(image, []).append((imagevalue, variable, value))
+
+	def __call__(self, variables, domains, assignments, forwardcheck=False):
+		images = self._images
+		after = {}
+		for variable in variables:
+			if variable in assignments:
+				image, value = images[(variable, assignments[variable])]
+				after[image] = value
+		for variable in variables:
+			if variable not in assignments:
+				if forwardcheck and variable in after:
+					domain = domains[variable]
+					for value in domain[:]:
+						if value > after[variable]:
+							domain.hideValue(value)
+					if not domain:
+						return False
+				return True
+			value = assignments[variable]
+			if variable not in after:
+				if forwardcheck:
+					for imagevalue, other, othervalue in self._before[variable]:
+						if imagevalue < value and other not in assignments:
+							domain = domains[other]
+							if othervalue in domain:
+								domain.hideValue(othervalue)
+								if not domain:
+									return False
+				return True
+			if value != after[variable]:
+				return value < after[variable]
+		return True
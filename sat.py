@@ -0,0 +1,338 @@
+# A SAT solver (CDCL: conflict-driven clause learning), in pure Python.
+
+# Usage: python3 sat.py problem.cnf
+# Reads a DIMACS CNF file and prints the result in the format SAT competitions use:
+# "s SATISFIABLE" and the model on "v" lines, or "s UNSATISFIABLE".
+
+# Variables are numbered from 1, and a literal is a variable (true) or its negation (false), as
+# in DIMACS files. The search is the usual one:
+# * Unit propagation with two watched literals per clause, so a clause is only looked at when one
+#   of the two literals it watches becomes false.
+# * On a conflict, a clause is learnt from the first unique implication point (1UIP), with the
+#   literals whose reasons are already in it removed, and the search jumps back to the second
+#   highest level in it.
+# * Decisions go to the unassigned variable with the highest activity (VSIDS: the variables in
+#   recent conflicts are bumped, and older bumps decay), with the value it last had (phase
+#   saving), or false the first time.
+# * Restarts after RESTART times the next number of the Luby sequence of conflicts (1, 1, 2, 1, 1,
+#   2, 4, ...), keeping the learnt clauses, activities and phases.
+# Learnt clauses are never deleted, which is fine for the size of the puzzles here.
+#   sat = CDCL()
+#   a, b = sat.newvar(), sat.newvar()
+#   sat.addclause([a, b]); sat.addclause([-a])
+#   if sat.solve(): print(sat.model[b])   # True
+# Clauses can be added between calls to solve, e.g. to block a solution and find another. Solving
+# under assumptions keeps everything learnt, so a clause can be switched on and off by adding a
+# literal that's assumed false to switch it on, and left out of the assumptions to switch it off.
+
+import heapq, sys
+
+RESTART = 100  # Conflicts per unit of the Luby sequence.
+DECAY = 0.95  # Activity decay per conflict.
+
+# The kth number (from 0) of the Luby sequence.
+def luby(k):
+	size, power = 1, 0
+	while size < k + 1:
+		power += 1
+		size = 2 * size + 1
+	while size - 1 != k:
+		size = (size - 1) // 2
+		power -= 1
+		k %= size
+	return 1 << power
+
+# Inside, literal v is 2v and -v is 2v + 1, so negating is flipping the lowest bit and the
+# variable is the code shifted right by one.
+def _code(literal):
+	return 2 * literal if literal > 0 else -2 * literal + 1
+
+class CDCL(object):
+	def __init__(self):
+		self.nvars = 0
+		self.clauses = []  # as given, for writing DIMACS
+		self.value = [0, 0]  # per literal code: 1 true, -1 false, 0 unassigned
+		self.level = [0]
+		self.reason = [None]
+		self.activity = [0.0]
+		self.phase = [False]
+		self.seen = [False]
+		self.watches = [[], []]
+		self.trail = []
+		self.limits = []  # where each decision level starts on the trail
+		self.head = 0  # trail entries before this have been propagated
+		self.heap = []
+		self.inc = 1.0
+		self.ok = True
+		self.model = None
+		self.stats = { "decisions": 0, "conflicts": 0, "learnt": 0, "restarts": 0 }
+
+	def newvar(self):
+		self.nvars += 1
+		self.value += [0, 0]
+		self.level.append(0)
+		self.reason.append(None)
+		self.activity.append(0.0)
+		self.phase.append(False)
+		self.seen.append(False)
+		self.watches += [[], []]
+		heapq.heappush(self.heap, (0.0, self.nvars))
+		return self.nvars
+
+	# Returns False if the clauses can no longer be satisfied.
+	def addclause(self, literals):
+		self.clauses.append(list(literals))
+		while max((abs(literal) for literal in literals), default=0) > self.nvars:
+			self.newvar()
+		if not self.ok:
+			return False
+		self._cancel(0)
+		value = self.value
+		codes = []
+		for code in set(_code(literal) for literal in literals):
+			if value[code] == 1 or code ^ 1 in codes:
+				return True
+			if value[code] == 0:
+				codes.append(code)
+		if not codes:
+			self.ok = False
+		elif len(codes) == 1:
+			self._assign(codes[0], None)
+			self.ok = self._propagate() is None
+		else:
+			self.watches[codes[0]].append(codes)
+			self.watches[codes[1]].append(codes)
+		return self.ok
+
+	def _assign(self, code, reason):
+		self.value[code] = 1
+		self.value[code ^ 1] = -1
+		self.level[code >> 1] = len(self.limits)
+		self.reason[code >> 1] = reason
+		self.trail.append(code)
+
+	# Undoes the assignments above the level.
+	def _cancel(self, level):
+		if len(self.limits) <= level:
+			return
+		start = self.limits[level]
+		value, reason, phase, activity, heap = self.value, self.reason, self.phase, self.activity, self.heap
+		for code in self.trail[start:]:
+			variable = code >> 1
+			value[code] = value[code ^ 1] = 0
+			reason[variable] = None
+			phase[variable] = not code & 1
+			heapq.heappush(heap, (-activity[variable], variable))
+		del self.trail[start:]
+		del self.limits[level:]
+		self.head = start
+		if len(heap) > 10 * self.nvars + 100:
+			self._rebuild()
+
+	# The heap can have several entries for a variable, with old activities. Only the unassigned
+	# variables' current ones are kept.
+	def _rebuild(self):
+		value, activity = self.value, self.activity
+		self.heap = [(-activity[v], v) for v in range(1, self.nvars + 1) if not value[2 * v]]
+		heapq.heapify(self.heap)
+
+	# Returns the clause that became false, if any. The first literal of a clause that is some
+	# assignment's reason is the one it assigned.
+	def _propagate(self):
+		value, watches, trail, level, reason = self.value, self.watches, self.trail, self.level, self.reason
+		current = len(self.limits)
+		while self.head < len(trail):
+			false = trail[self.head] ^ 1
+			self.head += 1
+			clauses = watches[false]
+			watches[false] = kept = []
+			i, n = 0, len(clauses)
+			while i < n:
+				clause = clauses[i]
+				i += 1
+				if clause[0] == false:
+					clause[0], clause[1] = clause[1], false
+				first = clause[0]
+				if value[first] == 1:
+					kept.append(clause)
+					continue
+				for k in range(2, len(clause)):
+					code = clause[k]
+					if value[code] != -1:
+						clause[1], clause[k] = code, false
+						watches[code].append(clause)
+						break
+				else:
+					kept.append(clause)
+					if value[first] == -1:
+						kept.extend(clauses[i:])
+						return clause
+					value[first] = 1
+					value[first ^ 1] = -1
+					level[first >> 1] = current
+					reason[first >> 1] = clause
+					trail.append(first)
+		return None
+
+	def _bump(self, variable):
+		activity = self.activity
+		activity[variable] += self.inc
+		if activity[variable] > 1e100:
+			for v in range(1, self.nvars + 1):
+				activity[v] *= 1e-100
+			self.inc *= 1e-100
+			self._rebuild()
+
+	# The learnt clause, asserting literal first and the highest of the rest second, and the level
+	# to go back to.
+	def _analyze(self, conflict):
+		seen, level, reason, trail = self.seen, self.level, self.reason, self.trail
+		current = len(self.limits)
+		learnt = [None]
+		marked = []
+		pending = 0
+		index = len(trail) - 1
+		clause = conflict
+		code = None
+		while True:
+			for other in clause:
+				variable = other >> 1
+				if other != code and not seen[variable] and level[variable] > 0:
+					seen[variable] = True
+					marked.append(variable)
+					self._bump(variable)
+					if level[variable] == current:
+						pending += 1
+					else:
+						learnt.append(other)
+			while not seen[trail[index] >> 1]:
+				index -= 1
+			code = trail[index]
+			index -= 1
+			pending -= 1
+			if not pending:
+				break
+			clause = reason[code >> 1]
+		learnt[0] = code ^ 1
+		# A literal is redundant if everything that implied it is already in the clause.
+		kept = [learnt[0]]
+		for other in learnt[1:]:
+			because = reason[other >> 1]
+			if because is None or any(not seen[c >> 1] and level[c >> 1] > 0 for c in because if c != other ^ 1):
+				kept.append(other)
+		for variable in marked:
+			seen[variable] = False
+		if len(kept) == 1:
+			return kept, 0
+		best = max(range(1, len(kept)), key=lambda k: level[kept[k] >> 1])
+		kept[1], kept[best] = kept[best], kept[1]
+		return kept, level[kept[1] >> 1]
+
+	def _decide(self):
+		heap, value = self.heap, self.value
+		while heap:
+			activity, variable = heapq.heappop(heap)
+			if not value[2 * variable]:
+				return 2 * variable + (0 if self.phase[variable] else 1)
+		return None
+
+	# Returns True and sets model (a list of booleans indexed by variable) if the clauses can be
+	# satisfied with the assumptions (literals) true, else False. Each assumption is decided
+	# first, at its own level, so what's learnt holds without them and is kept for later calls.
+	def solve(self, assumptions=()):
+		self.model = None
+		if not self.ok:
+			return False
+		self._cancel(0)
+		assumptions = [_code(literal) for literal in assumptions]
+		stats = self.stats
+		restarts = 0
+		budget = RESTART * luby(restarts)
+		while True:
+			conflict = self._propagate()
+			if conflict is not None:
+				stats["conflicts"] += 1
+				budget -= 1
+				if not self.limits:
+					self.ok = False
+					return False
+				learnt, back = self._analyze(conflict)
+				self._cancel(back)
+				if len(learnt) == 1:
+					self._assign(learnt[0], None)
+				else:
+					self.watches[learnt[0]].append(learnt)
+					self.watches[learnt[1]].append(learnt)
+					self._assign(learnt[0], learnt)
+					stats["learnt"] += 1
+				self.inc /= DECAY
+			elif budget <= 0:
+				restarts += 1
+				stats["restarts"] += 1
+				budget = RESTART * luby(restarts)
+				self._cancel(0)
+			else:
+				code = None
+				while len(self.limits) < len(assumptions):
+					code = assumptions[len(self.limits)]
+					if self.value[code] == -1:
+						return False
+					if self.value[code] == 0:
+						break
+					# Already true: an empty level keeps the levels lined up with the assumptions.
+					self.limits.append(len(self.trail))
+					code = None
+				if code is None:
+					code = self._decide()
+				if code is None:
+					value = self.value
+					self.model = [False] + [value[2 * v] == 1 for v in range(1, self.nvars + 1)]
+					return True
+				stats["decisions"] += 1
+				self.limits.append(len(self.trail))
+				self._assign(code, None)
+
+	# Whether the literal is true in the model.
+	def __getitem__(self, literal):
+		return self.model[literal] if literal > 0 else not self.model[-literal]
+
+	def write(self, file, comments=()):
+		for comment in comments:
+			file.write("c %s\n" % comment)
+		file.write("p cnf %d %d\n" % (self.nvars, len(self.clauses)))
+		for clause in self.clauses:
+			file.write(" ".join(str(literal) for literal in clause) + " 0\n")
+
+# Reads a DIMACS CNF file into a CDCL.
+def read(file):
+	sat = CDCL()
+	clause = []
+	for line in file:
+		if line.startswith("p"):
+			for _ in range(int(line.split()[2])):
+				sat.newvar()
+			continue
+		if line.startswith("c") or line.startswith("%"):
+			continue
+		for word in line.split():
+			literal = int(word)
+			if literal:
+				clause.append(literal)
+			else:
+				sat.addclause(clause)
+				clause = []
+	if clause:
+		sat.addclause(clause)
+	return sat
+
+if __name__ == "__main__":
+	with open(sys.argv[1]) as f:
+		sat = read(f)
+	if sat.solve():
+		print("s SATISFIABLE")
+		literals = [v if sat.model[v] else -v for v in range(1, sat.nvars + 1)]
+		for k in range(0, len(literals), 10):
+			print("v " + " ".join(str(literal) for literal in literals[k:k + 10]))
+		print("v 0")
+	else:
+		print("s UNSATISFIABLE")
@@ -0,0 +1,161 @@
+# Backtracking search that keeps statistics.
+
+# SearchSolver does the same kind of search as python-constraint's BacktrackingSolver (pick an
+# unassigned variable, try its values, forward check) and can be used in its place with
+# Problem(SearchSolver()) or problem.setSolver(SearchSolver()). After solving, stats has:
+#   nodes: the number of values tried, i.e. search tree nodes visited
+#   backtracks: the number of times a variable ran out of values and the search went back
+#   maxdepth: the most variables assigned at once
+
+# ordering chooses which unassigned variable to try next:
+#   "degree": the most constraints, then the fewest values left (what BacktrackingSolver does)
+#   "mrv": the fewest values left (Minimum Remaining Values), then the most constraints. This is
+#     the default, since on bench.py it visits no more nodes than "degree" on any benchmark, and
+#     far fewer on some (masyu 341 instead of 24848, compromised 1224 instead of 106235).
+#   "domwdeg": the lowest ratio of values left to the weights of its constraints. Every constraint
+#     starts with weight 1, and gets 1 more each time it rejects a value, so the search learns to
+#     start with the variables in the constraints that fail most. (The weights of all of a
+#     variable's constraints are counted, not only those with other unassigned variables.)
+# Ties go to the variable that sorts first, or that was added first if the names can't be sorted.
+# values chooses the order its values are tried in:
+#   None: last to first, like BacktrackingSolver
+#   "lcv": Least Constraining Value first, i.e. the value that leaves the most values in the
+#     other domains after forward checking. Values that fail the forward check aren't tried.
+#     Only used with forward checking. This visits fewer nodes, but the extra forward checks cost
+#     more than they save on every benchmark, so it's not the default.
+
+# If order is a list of variables, each solution is a tuple of their values in that order instead
+# of a dict, which is smaller and quicker to make when there are many solutions. With an empty
+# order, solutions are all (), for counting them.
+
+from constraint import BacktrackingSolver
+
+ORDERINGS = ["degree", "mrv", "domwdeg"]
+VALUES = [None, "lcv"]
+
+class SearchSolver(BacktrackingSolver):
+	def __init__(self, forwardcheck=True, order=None, ordering="mrv", values=None):
+		BacktrackingSolver.__init__(self, forwardcheck)
+		if ordering not in ORDERINGS:
+			raise ValueError("ordering must be one of %s" % ", ".join(ORDERINGS))
+		if values not in VALUES:
+			raise ValueError("values must be None or lcv")
+		self.stats = {}
+		self.order = order
+		self.ordering = ordering
+		self.values = values
+
+	# The function that gives each variable's sort key for the chosen ordering.
+	def _key(self, domains, vconstraints, weights):
+		try:
+			rank = { variable: k for k, variable in enumerate(sorted(domains)) }
+		except TypeError:
+			rank = { variable: k for k, variable in enumerate(domains) }
+		if self.ordering == "degree":
+			return lambda variable: (-len(vconstraints[variable]), len(domains[variable]), rank[variable])
+		if self.ordering == "mrv":
+			return lambda variable: (len(domains[variable]), -len(vconstraints[variable]), rank[variable])
+		def domwdeg(variable):
+			weight = sum(weights.get((id(constraint), id(variables)), 1) for constraint, variables in vconstraints[variable])
+			return (len(domains[variable]) / (weight or 1), rank[variable])
+		return domwdeg
+
+	# The variable's values, least constraining last since they're taken from the end. Leaves the
+	# domains as they were.
+	def _lcv(self, variable, domains, vconstraints, assignments, pushdomains):
+		scored = []
+		for value in domains[variable]:
+			assignments[variable] = value
+			for domain in pushdomains:
+				domain.pushState()
+			if all(constraint(variables, domains, assignments, pushdomains) for constraint, variables in vconstraints[variable]):
+				scored.append((sum(len(domain) for domain in pushdomains), value))
+			for domain in pushdomains:
+				domain.popState()
+		del assignments[variable]
+		scored.sort(key=lambda item: item[0])
+		return [value for left, value in scored]
+
+	def getSolutionIter(self, domains, constraints, vconstraints):
+		forwardcheck = self._forwardcheck
+		order = self.order
+		stats = self.stats
+		stats.clear()
+		stats["nodes"] = 0
+		stats["backtracks"] = 0
+		stats["maxdepth"] = 0
+		weights = {}
+		learn = self.ordering == "domwdeg"
+		key = self._key(domains, vconstraints, weights)
+		assignments = {}
+		queue = []
+
+		while True:
+			unassigned = [variable for variable in domains if variable not in assignments]
+			if unassigned:
+				variable = min(unassigned, key=key)
+				if forwardcheck:
+					pushdomains = [domains[x] for x in unassigned if x != variable]
+				else:
+					pushdomains = None
+				if self.values == "lcv" and pushdomains is not None:
+					values = self._lcv(variable, domains, vconstraints, assignments, pushdomains)
+				else:
+					values = domains[variable][:]
+			else:
+				# No unassigned variables. We've got a solution. Go back to last variable, if there's one.
+				if order is None:
+					yield assignments.copy()
+				else:
+					yield tuple([assignments[variable] for variable in order])
+				if not queue:
+					return
+				variable, values, pushdomains = queue.pop()
+				if pushdomains:
+					for domain in pushdomains:
+						domain.popState()
+
+			while True:
+				# We have a variable. Do we have any values left?
+				if not values:
+					# No. Go back to last variable, if there's one.
+					stats["backtracks"] += 1
+					# (It may not have been assigned, if lcv found no values.)
+					assignments.pop(variable, None)
+					while queue:
+						variable, values, pushdomains = queue.pop()
+						if pushdomains:
+							for domain in pushdomains:
+								domain.popState()
+						if values:
+							break
+						del assignments[variable]
+					else:
+						return
+
+				# Got a value. Check it.
+				assignments[variable] = values.pop()
+				stats["nodes"] += 1
+
+				if pushdomains:
+					for domain in pushdomains:
+						domain.pushState()
+
+				for constraint, variables in vconstraints[variable]:
+					if not constraint(variables, domains, assignments, pushdomains):
+						# Value is not good.
+						if learn:
+							weight = (id(constraint), id(variables))
+							weights[weight] = weights.get(weight, 1) + 1
+						break
+				else:
+					break
+
+				if pushdomains:
+					for domain in pushdomains:
+						domain.popState()
+
+			# Push state before looking for next variable.
+			queue.append((variable, values, pushdomains))
+			if len(queue) > stats["maxdepth"]:
+				stats["maxdepth"] = len(queue)
@@ -5,14 +5,22 @@
 # * No two stars may be adjacent, even diagonally.
 
 # This version uses a straightforward interpretation of the constraints. Each cell is a variable
-# set to either 0 or 1. There are S variables and 3S^2 - S + 1 constraints.
+# set to either 0 or 1, or only to its value if deduction.starbattle finds it first. There are S^2
+# variables, and 3S CountConstraints (for the rows, columns and groups) plus a constraint for each
+# pair of adjacent cells.
 
-from constraint import Problem, ExactSumConstraint, SomeNotInSetConstraint
-from itertools import combinations
+import sys, time
+from constraint import Problem, SomeNotInSetConstraint
+from deduction import starbattle, partialgrid
+from propagators import CountConstraint
+import stream
+from symmetry import cellmaps, breaksymmetry, expand
+from topology import Grid, KING
 
 N = 2  # number of stars per row/column/group
+SYMMETRY = False  # If True, only search for one of each set of symmetric solutions of the map.
 
-# From 2017 MIT Mystery Hunt. Solves in about 13 seconds.
+# From 2017 MIT Mystery Hunt. Solves in about 0.5 seconds.
 grid = """
 AABBBBBBCC
 ABBADDDDDC
@@ -36,45 +44,59 @@ if False:  # 5x5 example
 	AAAEE
 	"""
 
-# Transform the map into a list of lists
-grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
-groupnames = sorted(set(char for row in grid for char in row))
+grid = Grid(grid)
+groupnames = sorted(grid.regions())
 # Cells corresponding to each group
-groupcells = { groupname: [] for groupname in groupnames }
-for j, row in enumerate(grid):
-	for i, char in enumerate(row):
-		groupcells[char].append((i, j))
-cellnames = sorted(cell for group in groupcells.values() for cell in group)
+groupcells = grid.regions()
+cellnames = sorted(grid.cells)
 
-S = len(grid)  # size of the grid
-assert all(len(row) == S for row in grid)
+S = grid.H  # size of the grid
+assert grid.W == S and len(grid) == S * S
 assert len(groupnames) == S
 
-rownames = list(range(S))
-columnnames = list(range(S))
+# Cells that can be deduced before searching only get their known value. known is None if the
+# rules show the map has no solution.
+start = time.perf_counter()
+known = starbattle(grid, N)
+deducetime = time.perf_counter() - start
 
-def isadjacent(cell0, cell1):
-	(i0, j0), (i1, j1) = cell0, cell1
-	return abs(i0 - i1) <= 1 and abs(j0 - j1) <= 1
+# Raises ValueError if deducing showed the map has no solution.
+def model():
+	if known is None:
+		raise ValueError("the Star Battle map has no solution")
+	problem = Problem()
+	for cell in cellnames:
+		problem.addVariable(cell, [known[cell]] if cell in known else [0, 1])  # 1 = has a star
 
-problem = Problem()
-problem.addVariables(cellnames, [0, 1])  # 1 = has a star
+	# Each row, column, and group must have exactly N stars. Both the stars placed so far and the
+	# most that could still be placed are checked on partial assignments.
+	for cells in grid.rows() + grid.columns() + list(groupcells.values()):
+		problem.addConstraint(CountConstraint(N), cells)
 
-# Each row, column, and group must have exactly N stars
-for row in rownames:
-	problem.addConstraint(ExactSumConstraint(N), [(x, y) for x, y in cellnames if y == row])
-for col in columnnames:
-	problem.addConstraint(ExactSumConstraint(N), [(x, y) for x, y in cellnames if x == col])
-for cells in groupcells.values():
-	problem.addConstraint(ExactSumConstraint(N), cells)
+	# Adjacent cells may not both have a star
+	for cell0, cell1 in grid.edges(KING):
+		problem.addConstraint(SomeNotInSetConstraint([1]), [cell0, cell1])
+	return problem
 
-# Adjacent cells may not both have a star
-for cell0 in cellnames:
-	for cell1 in cellnames:
-		if cell0 < cell1 and isadjacent(cell0, cell1):
-			problem.addConstraint(SomeNotInSetConstraint([1]), [cell0, cell1])
-
-for solution in problem.getSolutions():
-	sgrid = { cell: "*" if solution[cell] else "." for cell in cellnames }
-	print("\n".join(" ".join(sgrid[(i, j)] for j in range(S)) for i in range(S)))
+# Importing this when the map has no solution raises the ValueError. Run as a script, it prints
+# that there's no solution instead.
+if __name__ != "__main__" or known is not None:
+	problem = model()
 
+if __name__ == "__main__":
+	if known is None:
+		print("No solution: deducing found a contradiction in %.3fs" % deducetime)
+		sys.exit()
+	print("Deduced %d of %d cells in %.3fs" % (len(known), len(grid), deducetime))
+	print("\n".join(partialgrid(grid, known)))
+	print()
+	solutions = stream.solutions(problem, cellnames)
+	if SYMMETRY:
+		maps = cellmaps(grid, [0, 1])
+		breaksymmetry(problem, maps, cellnames)
+		least = [dict(zip(cellnames, solution)) for solution in stream.solutions(problem, cellnames)]
+		print("%d symmetries, %d solutions up to symmetry" % (len(maps), len(least)))
+		solutions = [tuple(solution[cell] for cell in cellnames) for solution in expand(least, maps)]
+	for solution in solutions:
+		sgrid = { cell: "*" if star else "." for cell, star in zip(cellnames, solution) }
+		print("\n".join(" ".join(sgrid[(i, j)] for j in range(S)) for i in range(S)))
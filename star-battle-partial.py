@@ -1,9 +1,14 @@
 # Star Battle solver via CSP.
 
-# Uses a partial solve done manually to speed things up.
+# Fills in the cells that can be deduced before searching, to speed things up.
 
 from constraint import Problem
+import sys, time
 from itertools import combinations
+from deduction import starbattle, partialgrid
+from propagators import CountConstraint
+import stream
+from topology import Grid
 
 N = 2  # number of stars per row/column/group
 
@@ -21,35 +26,22 @@ GIIGJIJJJH
 GGGGJJJHHH
 """
 
-# partial solution: known cells are marked 0/1.
-# This speeds up the solution from 13s to 6s.
-partial = """
-..........
-.0..00000.
-....00..0.
-..........
-........0.
-..........
-..........
-..........
-..........
-..........
-"""
-partial = partial.strip().splitlines()
-
-# Transform the map into a list of lists
-grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
-groupnames = sorted(set(char for row in grid for char in row))
+grid = Grid(grid)
 # Cells corresponding to each group
-groupcells = { groupname: [] for groupname in groupnames }
-for j, row in enumerate(grid):
-	for i, char in enumerate(row):
-		groupcells[char].append((i, j))
+groupcells = grid.regions()
+groupnames = sorted(groupcells)
 
-S = len(grid)  # size of the grid
-assert all(len(row) == S for row in grid)
+S = grid.H  # size of the grid
+assert grid.W == S and len(grid) == S * S
 assert len(groupnames) == S
 
+# Partial solution: known cells are marked 0/1.
+# This speeds up the solution from 1.2s to 0.1s, and takes 0.1s itself.
+# known is None if the rules show the map has no solution.
+start = time.perf_counter()
+known = starbattle(grid, N)
+deducetime = time.perf_counter() - start
+
 rownames = list(range(S))
 columnnames = list(range(S))
 
@@ -65,38 +57,72 @@ def matchpartial(layout, prow):
 			return False
 	return True
 
-# Two layouts may be used on adjacent rows if none of their entries are adjacent.
-okadjacent = lambda x, y: not any(abs(a - b) <= 1 for a in x for b in y)
+# The variables' values are indexes into layouts, and every check is a lookup into a table that's
+# computed once here, rather than comparing the stars of two layouts on every call.
+# Bitmask of the columns that each layout has stars in.
+masks = [sum(1 << i for i in layout) for layout in layouts]
+# Two layouts may be used on adjacent rows if none of their entries are adjacent, i.e. if neither
+# layout has a star in any column next to or equal to the other's stars. compatible[k] is a bitset
+# of the layouts that may be used next to layout k.
+near = [mask | (mask << 1) | (mask >> 1) for mask in masks]
+compatible = [
+	sum(1 << k1 for k1, mask1 in enumerate(masks) if not near0 & mask1)
+	for near0 in near
+]
+okadjacent = lambda x, y: compatible[x] >> y & 1
 
 # Returns the constraint for a column, i.e. that exactly N rows have an element in that column.
 def okcolumn(columnname):
-	return lambda *layouts: sum(columnname in layout for layout in layouts) == N
+	hascolumn = [mask >> columnname & 1 for mask in masks]
+	return CountConstraint(N, [hascolumn] * S)
 
 # Returns the constraint and corresponding set of rows for the given group name.
 # i.e. that the number of stars in the group is equal to N.
 def okgroup(groupname):
 	cells = groupcells[groupname]
 	rows = sorted(set(j for i, j in cells))
-	# For each row under consideration, construct a set of all cells in that row.
-	cellsperrow = [set(i for i, j in cells if j == row) for row in rows]
-	# The number of stars in the group is the sum of the intersection of this set with the row's layout.
-	constraint = lambda *layouts: sum(len(cells & set(layout)) for cells, layout in zip(cellsperrow, layouts)) == N
-	return constraint, rows
-
-problem = Problem()
-for row in rownames:
-	problem.addVariable(row, [layout for layout in layouts if matchpartial(layout, partial[row])])
-for row1, row2 in zip(rownames[:-1], rownames[1:]):
-	problem.addConstraint(okadjacent, (row1, row2))
-for column in columnnames:
-	problem.addConstraint(okcolumn(column), rownames)
-for groupname in groupnames:
-	constraint, rows = okgroup(groupname)
-	problem.addConstraint(constraint, rows)
-
-for solution in problem.getSolutions():
+	# For each row under consideration, the number of stars each layout puts in the group.
+	counts = []
+	for row in rows:
+		rowmask = sum(1 << i for i, j in cells if j == row)
+		counts.append([bin(mask & rowmask).count("1") for mask in masks])
+	return CountConstraint(N, counts), rows
+
+if known is not None:
+	partial = partialgrid(grid, known)
+	# Each row's domain: the layouts that match the partial solution.
+	rowvalues = { row: [k for k, layout in enumerate(layouts) if matchpartial(layout, partial[row])] for row in rownames }
+
+# Raises ValueError if deducing showed the map has no solution.
+def model():
+	if known is None:
+		raise ValueError("the Star Battle map has no solution")
+	problem = Problem()
 	for row in rownames:
-		layout = solution[row]
-		print(" ".join("*" if i in layout else "." for i in range(S)))
+		problem.addVariable(row, rowvalues[row])
+	for row1, row2 in zip(rownames[:-1], rownames[1:]):
+		problem.addConstraint(okadjacent, (row1, row2))
+	for column in columnnames:
+		problem.addConstraint(okcolumn(column), rownames)
+	for groupname in groupnames:
+		constraint, rows = okgroup(groupname)
+		problem.addConstraint(constraint, rows)
+	return problem
+
+# Importing this when the map has no solution raises the ValueError. Run as a script, it prints
+# that there's no solution instead.
+if __name__ != "__main__" or known is not None:
+	problem = model()
+
+if __name__ == "__main__":
+	if known is None:
+		print("No solution: deducing found a contradiction in %.3fs" % deducetime)
+		sys.exit()
+	print("Deduced %d of %d cells in %.3fs" % (len(known), len(grid), deducetime))
+	print("\n".join(partial))
+	print("Layouts left per row:", " ".join(str(len(rowvalues[row])) for row in rownames), "of", len(layouts))
 	print()
-
+	for solution in stream.solutions(problem, rownames):
+		for layout in (layouts[k] for k in solution):
+			print(" ".join("*" if i in layout else "." for i in range(S)))
+		print()
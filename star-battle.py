@@ -11,11 +11,19 @@
 # There are S variables and 3S - 1 constraints.
 
 from constraint import Problem
+from functools import partial
 from itertools import combinations
+from memo import PureConstraint
+from propagators import CountConstraint
+import parallel, stream
+from symmetry import SQUARE, kept, breaksymmetry, expand
+from topology import Grid
 
 N = 2  # number of stars per row/column/group
+SYMMETRY = False  # If True, only search for one of each set of symmetric solutions of the map.
+PARALLEL = False  # If True, split the search over a process pool. See parallel.py.
 
-# From 2017 MIT Mystery Hunt. Solves in 12 seconds.
+# From 2017 MIT Mystery Hunt. Solves in 1 second.
 grid = """
 AABBBBBBCC
 ABBADDDDDC
@@ -29,58 +37,109 @@ GIIGJIJJJH
 GGGGJJJHHH
 """
 
-# Transform the map into a list of lists
-grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
-groupnames = sorted(set(char for row in grid for char in row))
-# Cells corresponding to each group
-groupcells = { groupname: [] for groupname in groupnames }
-for j, row in enumerate(grid):
-	for i, char in enumerate(row):
-		groupcells[char].append((i, j))
+# All length-N sequences of x's such that 0 <= x_i < S for all i, and x_i + 1 < x_(i+1).
+# This is all possible layouts of N stars in a length-S row.
+def rowlayouts(S, N):
+	spaced = lambda x: all(x[i] + 1 < x[i+1] for i in range(len(x) - 1))
+	return [layout for layout in combinations(range(S), N) if spaced(layout)]
 
-S = len(grid)  # size of the grid
-assert all(len(row) == S for row in grid)
-assert len(groupnames) == S
+# The problem for the given map, with N stars per row/column/group. Each row's value is an index
+# into rowlayouts(S, N).
+def model(grid, N):
+	grid = Grid(grid)
+	# Cells corresponding to each group
+	groupcells = grid.regions()
+	groupnames = sorted(groupcells)
 
-rownames = list(range(S))
-columnnames = list(range(S))
+	S = grid.H  # size of the grid
+	assert grid.W == S and len(grid) == S * S
+	assert len(groupnames) == S
 
-# All length-N sequences of x's such that 0 <= x_i < S for all i, and x_i + 1 < x_(i+1).
-# This is all possible layouts of N stars in a length-S row.
-spaced = lambda x: all(x[i] + 1 < x[i+1] for i in range(len(x) - 1))
-layouts = [layout for layout in combinations(range(S), N) if spaced(layout)]
+	rownames = list(range(S))
+	columnnames = list(range(S))
+	layouts = rowlayouts(S, N)
 
-# Two layouts may be used on adjacent rows if none of their entries are adjacent.
-okadjacent = lambda x, y: not any(abs(a - b) <= 1 for a in x for b in y)
+	# The variables' values are indexes into layouts, and every check is a lookup into a table
+	# that's computed once here, rather than comparing the stars of two layouts on every call.
+	# Bitmask of the columns that each layout has stars in.
+	masks = [sum(1 << i for i in layout) for layout in layouts]
+	# Two layouts may be used on adjacent rows if none of their entries are adjacent, i.e. if
+	# neither layout has a star in any column next to or equal to the other's stars. compatible[k]
+	# is a bitset of the layouts that may be used next to layout k.
+	near = [mask | (mask << 1) | (mask >> 1) for mask in masks]
+	compatible = [
+		sum(1 << k1 for k1, mask1 in enumerate(masks) if not near0 & mask1)
+		for near0 in near
+	]
+	okadjacent = lambda x, y: compatible[x] >> y & 1
 
-# Returns the constraint for a column, i.e. that exactly N rows have an element in that column.
-def okcolumn(columnname):
-	return lambda *layouts: sum(columnname in layout for layout in layouts) == N
+	# Returns the constraint for a column, i.e. that exactly N rows have an element in that column.
+	def okcolumn(columnname):
+		hascolumn = [mask >> columnname & 1 for mask in masks]
+		return CountConstraint(N, [hascolumn] * S)
 
-# Returns the constraint and corresponding set of rows for the given group name.
-# i.e. that the number of stars in the group is equal to N.
-def okgroup(groupname):
-	cells = groupcells[groupname]
-	rows = sorted(set(j for i, j in cells))
-	# For each row under consideration, construct a set of all cells in that row.
-	cellsperrow = [set(i for i, j in cells if j == row) for row in rows]
-	# The number of stars in the group is the sum of the intersection of this set with the row's layout.
-	constraint = lambda *layouts: sum(len(cells & set(layout)) for cells, layout in zip(cellsperrow, layouts)) == N
-	return constraint, rows
+	# Returns the constraint and corresponding set of rows for the given group name.
+	# i.e. that the number of stars in the group is equal to N.
+	def okgroup(groupname):
+		cells = groupcells[groupname]
+		rows = sorted(set(j for i, j in cells))
+		# For each row under consideration, the number of stars each layout puts in the group.
+		counts = []
+		for row in rows:
+			rowmask = sum(1 << i for i, j in cells if j == row)
+			counts.append([bin(mask & rowmask).count("1") for mask in masks])
+		return CountConstraint(N, counts), rows
 
-problem = Problem()
-problem.addVariables(rownames, layouts)
-for row1, row2 in zip(rownames[:-1], rownames[1:]):
-	problem.addConstraint(okadjacent, (row1, row2))
-for column in columnnames:
-	problem.addConstraint(okcolumn(column), rownames)
-for groupname in groupnames:
-	constraint, rows = okgroup(groupname)
-	problem.addConstraint(constraint, rows)
+	problem = Problem()
+	problem.addVariables(rownames, list(range(len(layouts))))
+	for row1, row2 in zip(rownames[:-1], rownames[1:]):
+		problem.addConstraint(PureConstraint(okadjacent), (row1, row2))
+	for column in columnnames:
+		problem.addConstraint(okcolumn(column), rownames)
+	for groupname in groupnames:
+		constraint, rows = okgroup(groupname)
+		problem.addConstraint(constraint, rows)
+	return problem
 
-for solution in problem.getSolutions():
-	for row in rownames:
-		layout = solution[row]
-		print(" ".join("*" if i in layout else "." for i in range(S)))
-	print()
+# What each symmetry of the map (see symmetry.py) does to each (row, layout). Only those that
+# keep rows as rows can be given this way: the identity, mirroring, and rotating by 180 degrees.
+def symmetries(grid, N):
+	grid = Grid(grid)
+	S = grid.H
+	layouts = rowlayouts(S, N)
+	index = { layout: k for k, layout in enumerate(layouts) }
+	maps = []
+	for name in kept(grid):
+		move = SQUARE[name]
+		images = {}
+		for row in range(S):
+			for k, layout in enumerate(layouts):
+				cells = [move(x, row, S) for x in layout]
+				if any(y != cells[0][1] for x, y in cells):
+					break
+				images[(row, k)] = (cells[0][1], index[tuple(sorted(x for x, y in cells))])
+			else:
+				continue
+			break
+		else:
+			maps.append(images)
+	return maps
 
+if __name__ == "__main__":
+	S = Grid(grid).H
+	layouts = rowlayouts(S, N)
+	problem = model(grid, N)
+	solutions = stream.solutions(problem, range(S))
+	if SYMMETRY:
+		maps = symmetries(grid, N)
+		breaksymmetry(problem, maps, range(S))
+		least = [dict(enumerate(solution)) for solution in stream.solutions(problem, range(S))]
+		print("%d symmetries, %d solutions up to symmetry" % (len(maps), len(least)))
+		solutions = [tuple(solution[row] for row in range(S)) for solution in expand(least, maps)]
+	elif PARALLEL:
+		found = parallel.solutions(partial(model, grid, N))
+		solutions = (tuple(solution[row] for row in range(S)) for solution in found)
+	for solution in solutions:
+		for layout in (layouts[k] for k in solution):
+			print(" ".join("*" if i in layout else "." for i in range(S)))
+		print()
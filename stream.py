@@ -0,0 +1,62 @@
+# Enumerating many solutions without keeping them.
+
+# problem.getSolutions() makes a dict for every solution and returns them all in a list, so memory
+# grows with the number of solutions. These stream them instead:
+#   count(problem)             the number of solutions, without making any of them
+#   solutions(problem, order)  each solution as a tuple of the values of the variables in order
+# Packing turns those tuples into fixed-size integers, using the fewest bits that can hold the
+# index of each variable's value in its domain, and writes and reads them as bytes. The written
+# solutions can be read back one at a time, so nothing needs to hold all of them.
+#   packing = Packing(problem, order)
+#   with open("solutions.bin", "wb") as f:
+#       packing.write(f, solutions(problem, order))
+#   with open("solutions.bin", "rb") as f:
+#       for solution in packing.read(f): ...
+
+from search import SearchSolver
+
+# Each solution as a tuple, in the order of the variables given, or the order they were added.
+# The problem's solver is replaced with a SearchSolver, which makes the tuples directly.
+def solutions(problem, order=None):
+	order = list(problem._variables) if order is None else list(order)
+	problem.setSolver(SearchSolver(order=order))
+	return problem.getSolutionIter()
+
+def count(problem):
+	return sum(1 for solution in solutions(problem, ()))
+
+class Packing(object):
+	def __init__(self, problem, order=None):
+		self.order = list(problem._variables) if order is None else list(order)
+		self.values = [list(problem._variables[variable]) for variable in self.order]
+		self.indexes = [{ value: k for k, value in enumerate(values) } for values in self.values]
+		self.bits = [max(1, (len(values) - 1).bit_length()) for values in self.values]
+		self.size = (sum(self.bits) + 7) // 8  # bytes per solution
+
+	def pack(self, solution):
+		packed = 0
+		for value, indexes, bits in zip(solution, self.indexes, self.bits):
+			packed = packed << bits | indexes[value]
+		return packed
+
+	def unpack(self, packed):
+		solution = []
+		for values, bits in zip(reversed(self.values), reversed(self.bits)):
+			solution.append(values[packed & ((1 << bits) - 1)])
+			packed >>= bits
+		return tuple(reversed(solution))
+
+	# Writes solutions to a binary file, and returns how many there were.
+	def write(self, file, solutions):
+		count = 0
+		for solution in solutions:
+			file.write(self.pack(solution).to_bytes(self.size, "little"))
+			count += 1
+		return count
+
+	def read(self, file):
+		while True:
+			data = file.read(self.size)
+			if len(data) < self.size:
+				return
+			yield self.unpack(int.from_bytes(data, "little"))
@@ -0,0 +1,66 @@
+# Batch Sudoku solver
+
+# Usage: python3 sudoku-batch.py puzzles.txt > solutions.jsonl
+
+# Each line of the input file is one puzzle, 81 characters read left to right and top to bottom,
+# with . or 0 for blanks. Each line of output is a JSON object with the puzzle's line number, the
+# puzzle, its first solution in the same format (or null if there is none), and the solve time in
+# seconds.
+
+# Uses the same row/column/box model as sudoku.py. The constraints don't depend on the puzzle, so
+# they're built once when the module loads and shared by every puzzle a worker solves. Each puzzle
+# only needs a fresh set of domains, with a single value for each given. The input is read and
+# handed out in chunks, so memory use doesn't grow with the size of the file.
+
+import sys, json, time
+from itertools import islice
+from multiprocessing import Pool
+from constraint import AllDifferentConstraint, BacktrackingSolver, Domain
+from sudoku import cellnames, groups, values
+
+PROCESSES = None  # None = one per CPU.
+ORDERED = True  # If False, write results as soon as they're done instead of in input order.
+CHUNK = 1000  # Number of puzzles read and handed to the pool at a time.
+
+# The shared model: a list of (constraint, variables), and each variable's constraints, in the
+# form that the solver takes directly.
+constraints = [(AllDifferentConstraint(), group) for group in groups]
+vconstraints = { cell: [] for cell in cellnames }
+for constraint, variables in constraints:
+	for cell in variables:
+		vconstraints[cell].append((constraint, variables))
+solver = BacktrackingSolver()
+
+def solve(job):
+	index, puzzle = job
+	start = time.perf_counter()
+	result = { "line": index + 1, "puzzle": puzzle, "solution": None }
+	if len(puzzle) != 81 or any(char not in values and char not in ".0" for char in puzzle):
+		result["error"] = "expected 81 characters of 1-9, . or 0"
+	else:
+		domains = {}
+		for k, char in enumerate(puzzle):
+			given = char not in ".0"
+			domains[(k // 9, k % 9)] = Domain([char] if given else values)
+		solution = solver.getSolution(domains, constraints, vconstraints)
+		if solution is not None:
+			result["solution"] = "".join(solution[(k // 9, k % 9)] for k in range(81))
+	result["time"] = round(time.perf_counter() - start, 6)
+	return result
+
+def readpuzzles(file):
+	for index, line in enumerate(file):
+		line = line.strip()
+		if line:
+			yield index, line
+
+if __name__ == "__main__":
+	with open(sys.argv[1]) as file, Pool(PROCESSES) as pool:
+		puzzles = readpuzzles(file)
+		while True:
+			chunk = list(islice(puzzles, CHUNK))
+			if not chunk:
+				break
+			results = pool.imap(solve, chunk) if ORDERED else pool.imap_unordered(solve, chunk)
+			for result in results:
+				print(json.dumps(result))
@@ -0,0 +1,205 @@
+# Sudoku solver, without the CSP solver.
+
+# Each cell's candidates are an integer bitmask, one bit per value. Between branches, the search
+# applies these until nothing changes:
+# * Naked singles: a cell with one candidate left removes it from every cell it shares a row,
+#   column or box with.
+# * Hidden singles: a value that only one cell of a row, column or box can take goes there.
+# * Naked pairs (if PAIRS): two cells of a row, column or box with the same two candidates remove
+#   them from the rest of it.
+# Then it branches on the cell with the fewest candidates left. Boxes can be BxB for B from 2 to
+# 5, i.e. grids from 4x4 up to 25x25. Values are written with the first N characters of SYMBOLS
+# unless given, and . is a blank.
+
+# The example 9x9 from sudoku.py solves in about 0.3ms (1ms the first time, which builds the
+# layout), and the 16x16 below in about 5ms. Puzzles made to be hard take 10-20ms, and a 25x25
+# with half its cells given about 0.1s. Running this also checks the solutions against
+# sudoku.py's model on generated 9x9 puzzles.
+
+import time
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
+PAIRS = True
+
+grid16 = """
+..8C.4.1DB.96..A
+B.D.F..5.3G6.7.4
+36..9D.B..7.FC.8
+..4..A.3.5CF92B.
+.8C.4...2..D.1..
+.D..........4.E.
+..G1D2397.5..BFC
+.4..AG16.FB8D392
+8CB...F...6.....
+.....B....EG7.4.
+4..FG.EAB89C..D3
+AG1E.3..54F.C...
+.1.436A.F..5....
+2..A.9DCEG.158.F
+.B9D5....2A3..G.
+...8.E.G....3A2.
+"""
+
+# For box size B: the rows, columns and boxes as lists of cell indexes (row * N + column), and for
+# each cell, the other cells that share one of them.
+layouts = {}
+def layout(B):
+	if B not in layouts:
+		N = B * B
+		units = [[row * N + col for col in range(N)] for row in range(N)]
+		units += [[row * N + col for row in range(N)] for col in range(N)]
+		units += [
+			[(by * B + y) * N + bx * B + x for y in range(B) for x in range(B)]
+			for by in range(B) for bx in range(B)
+		]
+		peers = [set() for cell in range(N * N)]
+		for unit in units:
+			for cell in unit:
+				peers[cell].update(unit)
+		peers = [sorted(others - {cell}) for cell, others in enumerate(peers)]
+		layouts[B] = units, peers
+	return layouts[B]
+
+# The puzzle's candidate masks. Spaces are ignored, and . (or 0 if it isn't a value) is a blank.
+def parse(text, symbols):
+	N = len(symbols)
+	rows = [row.replace(" ", "") for row in text.splitlines() if row.strip()]
+	if len(rows) != N or any(len(row) != N for row in rows):
+		raise ValueError("expected %d rows of %d characters" % (N, N))
+	full = (1 << N) - 1
+	candidates = []
+	for row in rows:
+		for char in row:
+			if char in symbols:
+				candidates.append(1 << symbols.index(char))
+			elif char == "." or char == "0":
+				candidates.append(full)
+			else:
+				raise ValueError("unexpected character %r" % char)
+	return candidates
+
+# Applies the rules above to candidates in place. queue has the cells that have one candidate
+# left which hasn't been removed from their peers yet. Returns False if some cell or unit is left
+# without a candidate.
+def propagate(candidates, queue, units, peers, full, pairs):
+	while True:
+		while queue:
+			cell = queue.pop()
+			bit = candidates[cell]
+			for peer in peers[cell]:
+				mask = candidates[peer]
+				if mask & bit:
+					mask ^= bit
+					if not mask:
+						return False
+					candidates[peer] = mask
+					if not mask & (mask - 1):
+						queue.append(peer)
+		for unit in units:
+			seen = twice = 0
+			for cell in unit:
+				mask = candidates[cell]
+				twice |= seen & mask
+				seen |= mask
+			if seen != full:
+				return False
+			once = seen & ~twice
+			while once:
+				bit = once & -once
+				once ^= bit
+				for cell in unit:
+					if candidates[cell] & bit:
+						if candidates[cell] != bit:
+							candidates[cell] = bit
+							queue.append(cell)
+						break
+			if pairs and not queue:
+				two = [candidates[cell] for cell in unit if bin(candidates[cell]).count("1") == 2]
+				for k, mask in enumerate(two):
+					if mask in two[k + 1:]:
+						for cell in unit:
+							other = candidates[cell]
+							if other != mask and other & mask:
+								other &= ~mask
+								if not other:
+									return False
+								candidates[cell] = other
+								if not other & (other - 1):
+									queue.append(cell)
+		if not queue:
+			return True
+
+# Every solution, as lists of masks. stats counts the branches tried as "nodes".
+def search(candidates, queue, units, peers, full, pairs, stats):
+	if not propagate(candidates, queue, units, peers, full, pairs):
+		return
+	best = None
+	fewest = None
+	for cell, mask in enumerate(candidates):
+		if mask & (mask - 1):
+			count = bin(mask).count("1")
+			if best is None or count < fewest:
+				best, fewest = cell, count
+				if count == 2:
+					break
+	if best is None:
+		yield candidates
+		return
+	mask = candidates[best]
+	while mask:
+		bit = mask & -mask
+		mask ^= bit
+		stats["nodes"] += 1
+		child = candidates[:]
+		child[best] = bit
+		yield from search(child, [best], units, peers, full, pairs, stats)
+
+# Every solution of the puzzle, as text with one row per line. Raises ValueError if B isn't from 2
+# to 5, there aren't N symbols, or the text isn't N rows of N cells.
+def solve(text, B=3, symbols=None, pairs=PAIRS, stats=None):
+	if not 2 <= B <= 5:
+		raise ValueError("box size must be from 2 to 5, not %r" % B)
+	N = B * B
+	symbols = symbols or SYMBOLS[:N]
+	if len(symbols) != N:
+		raise ValueError("expected %d symbols" % N)
+	candidates = parse(text, symbols)
+	units, peers = layout(B)
+	queue = [cell for cell, mask in enumerate(candidates) if not mask & (mask - 1)]
+	stats = stats if stats is not None else {}
+	stats["nodes"] = 0
+	return (
+		"\n".join(
+			"".join(symbols[solution[row * N + col].bit_length() - 1] for col in range(N))
+			for row in range(N)
+		)
+		for solution in search(candidates, queue, units, peers, (1 << N) - 1, pairs, stats)
+	)
+
+# Compares every solution with those of sudoku.py's model.
+def check(text):
+	import sudoku
+	expected = set(
+		"\n".join("".join(solution[(i, j)] for j in range(9)) for i in range(9))
+		for solution in sudoku.model(text).getSolutions()
+	)
+	assert set(solve(text)) == expected
+	return len(expected)
+
+def timed(text, B):
+	stats = {}
+	start = time.perf_counter()
+	solution = next(solve(text, B, stats=stats), None)
+	return solution, time.perf_counter() - start, stats["nodes"]
+
+if __name__ == "__main__":
+	import sudoku
+	from bench import gensudoku
+	for text, B in [(sudoku.grid, 3), (grid16, 4)]:
+		solution, seconds, nodes = timed(text, B)
+		print(solution)
+		print("%.2fms, %d branches" % (seconds * 1000, nodes))
+		print()
+	count = sum(check(gensudoku(givens, seed)) for givens in (36, 30, 26) for seed in range(5))
+	count += check(sudoku.grid)
+	print("Checked %d solutions against sudoku.py" % count)
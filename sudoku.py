@@ -1,6 +1,7 @@
 # Sudoku solver
 
 from constraint import Problem, AllDifferentConstraint, InSetConstraint
+import stream
 
 # Example from Wikipedia.
 # Solves in 0.1s
@@ -15,28 +16,43 @@ grid = """
 ...419..5
 ....8..79
 """
-grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
-S = len(grid)
-cellnames = [(i,j) for j, row in enumerate(grid) for i, val in enumerate(row)]
-lookup = { (i,j): grid[i][j] for i, j in cellnames }
-
-problem = Problem()
-problem.addVariables(cellnames, [str(j) for j in range(1, 10)])
+cellnames = [(i, j) for i in range(9) for j in range(9)]
+values = [str(j) for j in range(1, 10)]
 
+# Groups of cells that must all be different.
+groups = []
 for j in range(9):
 	# Cells in a column must all be different
-	problem.addConstraint(AllDifferentConstraint(), [(i, j) for i in range(9)])
+	groups.append([(i, j) for i in range(9)])
 	# Cells in a row must all be different
-	problem.addConstraint(AllDifferentConstraint(), [(j, i) for i in range(9)])
+	groups.append([(j, i) for i in range(9)])
 for i in range(3):
 	for j in range(3):
 		# Cells in a 3x3 group must all be different
-		problem.addConstraint(AllDifferentConstraint(), [(i*3+a, j*3+b) for a in range(3) for b in range(3)])
-for cell, value in lookup.items():
-	if value != ".":
-		problem.addConstraint(InSetConstraint([str(value)]), [cell])
+		groups.append([(i*3+a, j*3+b) for a in range(3) for b in range(3)])
+
+# The rules, without any givens.
+def rules(solver=None):
+	problem = Problem(solver)
+	problem.addVariables(cellnames, values)
+	for group in groups:
+		problem.addConstraint(AllDifferentConstraint(), group)
+	return problem
+
+# The problem for the given puzzle, as text with one row per line and . for blanks.
+def model(grid, solver=None):
+	grid = [list(row.strip()) for row in grid.splitlines() if row.strip()]
+	problem = rules(solver)
+	for i, j in cellnames:
+		if grid[i][j] != ".":
+			problem.addConstraint(InSetConstraint([grid[i][j]]), [(i, j)])
+	return problem
 
-for solution in problem.getSolutions():
-	print("\n".join(" ".join(solution[(i, j)] for j in range(9)) for i in range(9)))
-	print()
+# A puzzle as text, from a { cell: digit } of its givens.
+def text(givens):
+	return "\n".join("".join(givens.get((i, j), ".") for j in range(9)) for i in range(9))
 
+if __name__ == "__main__":
+	for solution in stream.solutions(model(grid), cellnames):
+		print("\n".join(" ".join(solution[i * 9 + j] for j in range(9)) for i in range(9)))
+		print()
@@ -0,0 +1,109 @@
+# Symmetries of square puzzles, and searching for one solution of each set of symmetric ones.
+
+# Usage: python3 symmetry.py [N...]
+# Counts the solutions of N queens (8 and 10 by default), and of a Star Battle map whose groups
+# are its rows, with and without breaking the symmetries, and prints the counts up to symmetry
+# and in all, with the time and search nodes each way.
+
+# A symmetry is one of the 8 ways to rotate or mirror a square, as a function from a cell (x, y)
+# of an S by S grid to where it goes. kept(grid) is the names of those that map every group of
+# the grid onto a group (maybe a different one), so the puzzle's rules don't change. All of them
+# are kept by N queens, which has no groups.
+
+# A model says what a symmetry does to its solutions with a map from each (variable, value) to the
+# (variable, value) it becomes, e.g. { (row, column): (row, N - 1 - column) } for N queens mirrored
+# left to right. Then:
+#   breaksymmetry(problem, maps, order)   only allow the least of each set of symmetric solutions
+#   orbit(solution, maps)                 the different solutions that are symmetric to a solution
+#   expand(solutions, maps)               every solution, from the least ones
+# cellmaps(grid, values) makes the maps for a model with a variable for each cell.
+# maps should include the identity (which breaksymmetry skips), and be a group: the maps of any two
+# symmetries one after the other should be in it too. Then each set of symmetric solutions has
+# exactly one least one, in the order of the variables given (and their values' order).
+
+import argparse, time
+from propagators import LexLeaderConstraint
+
+SQUARE = {
+	"identity": lambda x, y, S: (x, y),
+	"rotate90": lambda x, y, S: (S - 1 - y, x),
+	"rotate180": lambda x, y, S: (S - 1 - x, S - 1 - y),
+	"rotate270": lambda x, y, S: (y, S - 1 - x),
+	"mirrorx": lambda x, y, S: (S - 1 - x, y),
+	"mirrory": lambda x, y, S: (x, S - 1 - y),
+	"transpose": lambda x, y, S: (y, x),
+	"antitranspose": lambda x, y, S: (S - 1 - y, S - 1 - x),
+}
+
+# The names of the symmetries that map each group of the grid (cells with the same character)
+# onto a group, different groups onto different ones.
+def kept(grid):
+	S = grid.H
+	if grid.W != S or len(grid) != S * S:
+		return ["identity"]
+	names = []
+	for name, move in SQUARE.items():
+		onto = {}
+		if all(onto.setdefault(grid[cell], grid[move(*cell, S)]) == grid[move(*cell, S)] for cell in grid):
+			if len(set(onto.values())) == len(onto):
+				names.append(name)
+	return names
+
+# The maps for a model whose variables are the grid's cells, for each symmetry it keeps: each
+# cell's value goes to the cell the symmetry moves it to.
+def cellmaps(grid, values):
+	S = grid.H
+	return [
+		{ (cell, value): (SQUARE[name](*cell, S), value) for cell in grid for value in values }
+		for name in kept(grid)
+	]
+
+def isidentity(images):
+	return all(literal == image for literal, image in images.items())
+
+def breaksymmetry(problem, maps, order):
+	for images in maps:
+		if not isidentity(images):
+			problem.addConstraint(LexLeaderConstraint(images), list(order))
+
+def orbit(solution, maps):
+	images = []
+	for literals in maps:
+		image = dict(literals[item] for item in solution.items())
+		if image not in images:
+			images.append(image)
+	return images
+
+def expand(solutions, maps):
+	for solution in solutions:
+		yield from orbit(solution, maps)
+
+if __name__ == "__main__":
+	from bench import script
+	from search import SearchSolver
+	from topology import Grid
+	nqueens = script("nqueens")
+	starbattle = script("star-battle")
+	parser = argparse.ArgumentParser()
+	parser.add_argument("sizes", nargs="*", type=int, default=[8, 10], help="N queens sizes")
+	args = parser.parse_args()
+
+	def run(name, model, maps, order):
+		for broken in (False, True):
+			problem = model()
+			if broken:
+				breaksymmetry(problem, maps, order)
+			solver = SearchSolver()
+			problem.setSolver(solver)
+			start = time.perf_counter()
+			solutions = list(problem.getSolutionIter())
+			total = sum(len(orbit(solution, maps)) for solution in solutions) if broken else len(solutions)
+			seconds = time.perf_counter() - start
+			print("%-22s %-9s %8s up to symmetry %8d in all %8.3fs %9d nodes" % (
+				name, "broken" if broken else "", len(solutions) if broken else "-", total, seconds, solver.stats["nodes"]))
+
+	for N in args.sizes:
+		run("nqueens-%d" % N, lambda: nqueens.model(N), nqueens.symmetries(N), range(N))
+	rows = "\n".join(chr(65 + y) * 8 for y in range(8))
+	print("star battle groups as rows:", ", ".join(kept(Grid(rows))))
+	run("star-battle-rows", lambda: starbattle.model(rows, 1), starbattle.symmetries(rows, 1), range(8))
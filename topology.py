@@ -0,0 +1,141 @@
+# Grid topology shared by the puzzle scripts.
+
+# A Grid is parsed once from the puzzle text. Cells are (x, y) pairs, x being the column and y the
+# row, and the puzzle characters are stored as one string per row. Everything a model needs to
+# know about which cells are related (neighbors, rows, columns, regions, edges) is built from
+# offsets with one pass over the cells, instead of comparing every pair of cells.
+
+# Neighbor offsets.
+ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL = [(1, 1), (-1, -1), (1, -1), (-1, 1)]
+KING = ORTHOGONAL + DIAGONAL
+# A hex grid drawn as rows that shift by half a cell, like the Fences puzzle.
+HEX = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1)]
+
+class Grid(object):
+	# Rows of the text that are blank are skipped. If strip is True, leading and trailing whitespace
+	# is removed from every row. Otherwise, leading spaces are kept as offsets and spaces aren't
+	# cells, which is how a hex grid is drawn.
+	def __init__(self, text, strip=True):
+		lines = [line.strip() if strip else line.rstrip() for line in text.splitlines()]
+		self.lines = [line for line in lines if line.strip()]
+		self.H = len(self.lines)
+		self.W = max(len(line) for line in self.lines)
+		self.cells = [
+			(x, y)
+			for y, line in enumerate(self.lines)
+			for x, char in enumerate(line)
+			if char != " "
+		]
+		self._cellset = set(self.cells)
+
+	def __getitem__(self, cell):
+		x, y = cell
+		return self.lines[y][x]
+
+	def __contains__(self, cell):
+		return cell in self._cellset
+
+	def __iter__(self):
+		return iter(self.cells)
+
+	def __len__(self):
+		return len(self.cells)
+
+	# For each cell, the cells in the grid at the given offsets from it.
+	def neighbors(self, offsets=ORTHOGONAL):
+		return {
+			(x, y): [(x + dx, y + dy) for dx, dy in offsets if (x + dx, y + dy) in self._cellset]
+			for x, y in self.cells
+		}
+
+	# Cells in each row, from top to bottom, as a list of lists.
+	def rows(self):
+		rows = [[] for y in range(self.H)]
+		for x, y in self.cells:
+			rows[y].append((x, y))
+		return rows
+
+	# Cells in each column, from left to right, as a list of lists.
+	def columns(self):
+		columns = [[] for x in range(self.W)]
+		for x, y in self.cells:
+			columns[x].append((x, y))
+		return columns
+
+	# Cells that have each character, as a dict.
+	def regions(self):
+		regions = {}
+		for cell in self.cells:
+			regions.setdefault(self[cell], []).append(cell)
+		return regions
+
+	# Every pair of neighboring cells as a sorted tuple, once each, in sorted order. If border is
+	# True, pairs between a cell and a position just outside the grid are included too.
+	def edges(self, offsets=ORTHOGONAL, border=False):
+		edges = set()
+		for x, y in self.cells:
+			for dx, dy in offsets:
+				other = (x + dx, y + dy)
+				if border or other in self._cellset:
+					edges.add(tuple(sorted([(x, y), other])))
+		return sorted(edges)
+
+	# For each cell, the edges that touch it.
+	def incidence(self, edges):
+		incidence = { cell: [] for cell in self.cells }
+		for edge in edges:
+			for cell in edge:
+				if cell in incidence:
+					incidence[cell].append(edge)
+		return incidence
+
+# The offsets that lead to a position next to both ends of an edge, for each edge direction. These
+# are the third corners of the triangles the edge is a side of.
+def _thirds(offsets):
+	offsetset = set(offsets)
+	return {
+		(dx, dy): [(ox, oy) for ox, oy in offsets if (ox - dx, oy - dy) in offsetset]
+		for dx, dy in offsets
+	}
+
+# For each edge, and each triangle of mutually neighboring positions it's a side of, the other two
+# sides of that triangle (whether or not they're in edges).
+def _triangles(edges, offsets):
+	thirds = _thirds(offsets)
+	for edge in edges:
+		(x0, y0), (x1, y1) = edge
+		for ox, oy in thirds[(x1 - x0, y1 - y0)]:
+			corner = (x0 + ox, y0 + oy)
+			yield edge, tuple(sorted([(x0, y0), corner])), tuple(sorted([(x1, y1), corner]))
+
+# Every set of three edges that form a triangle, as a sorted tuple.
+# On a square grid there are none. On a hex grid these are the three fences around a vertex.
+def triangles(edges, offsets=HEX):
+	edgeset = set(edges)
+	return set(
+		tuple(sorted(trio))
+		for trio in _triangles(edges, offsets)
+		if trio[1] in edgeset and trio[2] in edgeset
+	)
+
+# Every ordered pair of edges that are two sides of the same triangle, i.e. the edges share a cell
+# and their other cells are neighbors. On a hex grid these are fences that meet at a vertex.
+def adjacentedges(edges, offsets=HEX):
+	edgeset = set(edges)
+	pairs = set()
+	for edge, side0, side1 in _triangles(edges, offsets):
+		for side in (side0, side1):
+			if side in edgeset:
+				pairs.add((edge, side))
+				pairs.add((side, edge))
+	return pairs
+
+# For each edge, the two vertices at its ends, each named by the sorted positions around it.
+# On a hex grid, fences that meet at a vertex are adjacent edges (see adjacentedges), so with
+# these as LoopConstraint's ends, the fences that are on must form one closed loop.
+def vertices(edges, offsets=HEX):
+	ends = {}
+	for edge, side0, side1 in _triangles(edges, offsets):
+		ends.setdefault(edge, []).append(tuple(sorted(set(edge + side0))))
+	return { edge: tuple(corners) for edge, corners in ends.items() }
@@ -0,0 +1,85 @@
+# Checking whether a puzzle has no solution, one, or more, without finding all of them.
+
+# Usage: python3 unique.py [names...] [--limit k] [--sat]
+# Checks the benchmarks from bench.py (those whose names start with names, or all but the slow
+# ones), and prints each one's status, how long it took, and how many variables have different
+# values in the solutions found.
+
+# solve(problem, limit) stops as soon as it has limit solutions, and returns a status with them:
+#   NONE: there are no solutions
+#   UNIQUE: there's exactly one
+#   SOME: there's at least one (when limit is 1)
+#   MULTIPLE: there are at least two
+# If fewer than limit solutions were found, they are all of them. unique(problem) is solve with a
+# limit of 2, which is all it takes to tell a valid puzzle from one with more than one answer.
+# Solutions are found with the problem's solver, one at a time if it can (BacktrackingSolver,
+# SearchSolver and SatSolver all can).
+
+import argparse, time
+from itertools import islice
+
+NONE = "none"
+UNIQUE = "unique"
+SOME = "some"
+MULTIPLE = "multiple"
+
+# Up to limit solutions (or all of them if limit is None), and the status.
+def solve(problem, limit=2):
+	try:
+		solutions = list(islice(problem.getSolutionIter(), limit))
+	except NotImplementedError:
+		if limit == 1:
+			solution = problem.getSolution()
+			solutions = [solution] if solution is not None else []
+		else:
+			solutions = problem.getSolutions()[:limit]
+	return status(solutions, limit), solutions
+
+# The status of the solutions found with the limit.
+def status(solutions, limit):
+	if not solutions:
+		return NONE
+	if len(solutions) > 1:
+		return MULTIPLE
+	return SOME if limit == 1 else UNIQUE
+
+def unique(problem):
+	return solve(problem, 2)
+
+# The variables that don't have the same value in every solution, with the values they have.
+def differences(solutions):
+	if not solutions:
+		return {}
+	values = {}
+	for variable in solutions[0]:
+		seen = []
+		for solution in solutions:
+			if solution[variable] not in seen:
+				seen.append(solution[variable])
+		if len(seen) > 1:
+			values[variable] = seen
+	return values
+
+if __name__ == "__main__":
+	from bench import BENCHMARKS
+	from cnf import SatSolver
+	from search import SearchSolver
+	parser = argparse.ArgumentParser()
+	parser.add_argument("names", nargs="*", help="only check benchmarks starting with these")
+	parser.add_argument("--limit", type=int, default=2, help="stop after this many solutions")
+	parser.add_argument("--sat", action="store_true", help="solve with the SAT solver")
+	args = parser.parse_args()
+
+	for name, (build, slow) in BENCHMARKS.items():
+		if args.names and not any(name.startswith(n) for n in args.names):
+			continue
+		if slow and not args.names:
+			continue
+		problem = build()
+		problem.setSolver(SatSolver() if args.sat else SearchSolver())
+		start = time.perf_counter()
+		result, solutions = solve(problem, args.limit)
+		seconds = time.perf_counter() - start
+		differ = differences(solutions)
+		print("%-22s %-8s %3d found %8.3fs" % (name, result, len(solutions), seconds),
+			"(%d variables differ)" % len(differ) if differ else "")